@@ -0,0 +1,212 @@
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import pandas as pd
+
+from mousestyles import data
+from mousestyles.data.utils import run_offsets
+
+# region ids, in the order of the rows and columns of the transition
+# count matrices
+REGIONS = ['niche', 'food', 'water', 'open_floor']
+NICHE, FOOD, WATER, OPEN_FLOOR = range(len(REGIONS))
+
+# (xlims, ylims) of the food hopper and the water spout, covering the
+# positions recorded during feeding and drinking intervals; positions
+# in front of the hopper fall slightly outside the cage bounds
+FOOD_REGION = ((-16.25, -10.0), (0.0, 4.5))
+WATER_REGION = ((-4.5, 3.75), (0.0, 10.0))
+
+
+def label_regions(movement, food_region=FOOD_REGION,
+                  water_region=WATER_REGION):
+    r"""
+    Return the cage region of every observation: the niche when the
+    home base sensor is on (the isHB column), else the food hopper or
+    the water spout when the position is in their rectangle (bounds
+    included), else the open floor.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status of one mouseday, or
+        of many mousedays as returned by data.load_all_movement
+    food_region : tuple
+        ((xmin, xmax), (ymin, ymax)) rectangle of the food hopper
+    water_region : tuple
+        ((xmin, xmax), (ymin, ymax)) rectangle of the water spout
+
+    Returns
+    -------
+    region : numpy.ndarray
+        int8 array of region ids, indices in REGIONS
+
+    Examples
+    --------
+    >>> movement = data.load_movement(1, 2, 1)
+    >>> region = label_regions(movement)
+    """
+    x = np.asarray(movement['x'], dtype=float)
+    y = np.asarray(movement['y'], dtype=float)
+    region = np.full(len(x), OPEN_FLOOR, dtype=np.int8)
+    # later assignments take precedence
+    for region_id, ((x0, x1), (y0, y1)) in [(WATER, water_region),
+                                            (FOOD, food_region)]:
+        if x0 > x1 or y0 > y1:
+            raise ValueError("lower limits must not exceed upper limits")
+        region[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)] = region_id
+    region[np.asarray(movement['isHB'], dtype=bool)] = NICHE
+    return region
+
+
+def region_visits(movement=None, food_region=FOOD_REGION,
+                  water_region=WATER_REGION):
+    r"""
+    Return every visit of every mouseday to a cage region, a visit
+    being a run of consecutive observations in the same region as
+    labelled by label_regions.
+
+    A visit lasts from its first observation to the first observation
+    of the next visit, so that the time between two observations is
+    credited to the region of the first one as in
+    home_base.cell_occupancy; the last visit of a mouseday ends with
+    its last observation.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame, optional
+        movement of many mousedays as returned by
+        ``data.load_all_movement``, loaded if not given
+    food_region : tuple
+        ((xmin, xmax), (ymin, ymax)) rectangle of the food hopper
+    water_region : tuple
+        ((xmin, xmax), (ymin, ymax)) rectangle of the water spout
+
+    Returns
+    -------
+    visits : pandas.DataFrame
+        one row per visit with columns strain, mouse, day, region (the
+        region id), start_time, stop_time and duration
+
+    Examples
+    --------
+    >>> visits = region_visits()
+    >>> visits.groupby('region')['duration'].mean()
+    """
+    if movement is None:
+        movement = data.load_all_movement()
+    labels, mouseday, region, start, stop = _region_runs(
+        movement, food_region, water_region)
+    t = np.asarray(movement['t'], dtype=float)
+    visits = pd.DataFrame(labels[mouseday],
+                          columns=['strain', 'mouse', 'day'])
+    visits['region'] = region
+    visits['start_time'] = t[start]
+    visits['stop_time'] = t[stop]
+    visits['duration'] = t[stop] - t[start]
+    return visits
+
+
+def region_transition_graph(movement=None, by='mouseday',
+                            food_region=FOOD_REGION,
+                            water_region=WATER_REGION):
+    r"""
+    Return the number of transitions between every pair of cage
+    regions and the time spent in every region, for every mouseday or
+    every strain.
+
+    A transition is a change of region between consecutive
+    observations of the same mouseday, as labelled by label_regions;
+    the visits it separates are those of region_visits.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame, optional
+        movement of many mousedays as returned by
+        ``data.load_all_movement``, loaded if not given
+    by : str
+        'mouseday' or 'strain', the groups counted separately
+    food_region : tuple
+        ((xmin, xmax), (ymin, ymax)) rectangle of the food hopper
+    water_region : tuple
+        ((xmin, xmax), (ymin, ymax)) rectangle of the water spout
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        (G, 3) array of strain, mouse and day of each mouseday, or
+        (G, 1) array of strains
+    counts : numpy.ndarray
+        (G, 4, 4) array where counts[g, i, j] is the number of
+        transitions from region REGIONS[i] to region REGIONS[j]
+    dwell : pandas.DataFrame
+        one row per group with the key columns, then for each region
+        its total time in seconds, number of visits and mean visit
+        duration, as columns <region>_time, <region>_visits and
+        <region>_mean_visit
+
+    Examples
+    --------
+    >>> labels, counts, dwell = region_transition_graph(by='strain')
+    >>> counts.shape
+    (3, 4, 4)
+    """
+    if by not in ('mouseday', 'strain'):
+        raise ValueError("by should be 'mouseday' or 'strain'")
+    if movement is None:
+        movement = data.load_all_movement()
+    labels, mouseday, region, start, stop = _region_runs(
+        movement, food_region, water_region)
+    if by == 'strain':
+        labels, group = np.unique(labels[:, 0], return_inverse=True)
+        labels = labels[:, np.newaxis]
+        group = group[mouseday]
+    else:
+        group = mouseday
+    n_groups, n_regions = len(labels), len(REGIONS)
+
+    # consecutive visits of the same mouseday are transitions
+    same_day = mouseday[1:] == mouseday[:-1]
+    pairs = (group[1:] * n_regions + region[:-1]) * n_regions + region[1:]
+    counts = np.bincount(pairs[same_day],
+                         minlength=n_groups * n_regions * n_regions)
+    counts = counts.reshape((n_groups, n_regions, n_regions))
+
+    t = np.asarray(movement['t'], dtype=float)
+    cells = group * n_regions + region
+    size = n_groups * n_regions
+    time = np.bincount(cells, weights=t[stop] - t[start], minlength=size)
+    visits = np.bincount(cells, minlength=size)
+    time = time.reshape((n_groups, n_regions))
+    visits = visits.reshape((n_groups, n_regions))
+    dwell = pd.DataFrame(labels, columns=['strain', 'mouse', 'day']
+                         if by == 'mouseday' else ['strain'])
+    for j, name in enumerate(REGIONS):
+        dwell[name + '_time'] = time[:, j]
+        dwell[name + '_visits'] = visits[:, j]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dwell[name + '_mean_visit'] = time[:, j] / visits[:, j]
+    return labels, counts, dwell
+
+
+def _region_runs(movement, food_region, water_region):
+    """
+    Return (labels, mouseday, region, start, stop): the (n, 3) strain,
+    mouse and day of every mouseday, then for every run of
+    observations in the same region its mouseday, its region id and
+    the rows of its first observation and of the first observation
+    after it (its own last one at the end of a mouseday).
+    """
+    labels, offsets = run_offsets(movement[['strain', 'mouse', 'day']])
+    sample_region = label_regions(movement, food_region, water_region)
+    n = len(sample_region)
+    # a run starts at every change of region and every new mouseday
+    new_run = np.ones(n, dtype=bool)
+    new_run[1:] = sample_region[1:] != sample_region[:-1]
+    new_run[offsets[:-1]] = True
+    start = np.flatnonzero(new_run)
+    mouseday = np.searchsorted(offsets, start, side='right') - 1
+    stop = np.append(start[1:], n)
+    last = stop == offsets[mouseday + 1]
+    stop[last] -= 1
+    return labels, mouseday, sample_region[start], start, stop
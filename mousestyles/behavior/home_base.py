@@ -0,0 +1,186 @@
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import pandas as pd
+
+from mousestyles import data
+from mousestyles.data.utils import (run_offsets,
+                                    total_time_rectangle_bins_windows)
+
+# cage bounds used by data.utils.map_xbins_ybins_to_cage
+CAGE_XLIMS = (-16.25, 3.75)
+CAGE_YLIMS = (1.0, 43.0)
+
+
+def cell_occupancy(movement=None, xbins=2, ybins=4):
+    r"""
+    Return the time spent by the mouse in each cell of an
+    xbins x ybins grid over the cage, for every mouseday.
+
+    Row 0 of the grid is the back of the cage (largest y), so cell
+    (h, l) is the rectangle given by
+    ``data.utils.map_xbins_ybins_to_cage(rectangle=(h, l))``.
+    The time between two observations is credited to the cell of
+    the first one, as in ``data.utils.total_time_rectangle_bins``.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame, optional
+        movement of many mousedays as returned by
+        ``data.load_all_movement``, loaded if not given
+    xbins : int
+        positive integer, number of cells along the x axis
+    ybins : int
+        positive integer, number of cells along the y axis
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        (n, 3) array of strain, mouse and day of each mouseday
+    occupancy : numpy.ndarray
+        (n, ybins, xbins) array of seconds spent in each cell
+
+    Examples
+    --------
+    >>> labels, occupancy = cell_occupancy()
+    >>> occupancy.shape
+    (137, 4, 2)
+    """
+    if type(xbins) != int or type(ybins) != int:
+        raise TypeError("xbins and ybins need to be integer")
+    if xbins <= 0 or ybins <= 0:
+        raise ValueError("xbins and ybins need to be positive")
+    if movement is None:
+        movement = data.load_all_movement()
+    labels, offsets = run_offsets(movement[["strain", "mouse", "day"]])
+    TXY = np.vstack([movement["t"], movement["x"], movement["y"]])
+    occupancy = total_time_rectangle_bins_windows(
+        TXY, offsets, xlims=CAGE_XLIMS, ylims=CAGE_YLIMS,
+        xbins=xbins, ybins=ybins)
+    return labels, occupancy
+
+
+def detect_home_base(movement=None, xbins=2, ybins=4):
+    r"""
+    Return the home base of every mouseday, defined as the cell of the
+    2 x 4 grid over the cage with the largest occupancy time.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame, optional
+        movement of many mousedays as returned by
+        ``data.load_all_movement``, loaded if not given
+    xbins : int
+        positive integer, number of cells along the x axis
+    ybins : int
+        positive integer, number of cells along the y axis
+
+    Returns
+    -------
+    home_base : pandas.DataFrame
+        one row per mouseday with columns strain, mouse, day, row and
+        col (the home base cell, as in ``cell_occupancy``) and
+        occupancy (the fraction of time spent in it)
+
+    Examples
+    --------
+    >>> home_base = detect_home_base()
+    >>> list(home_base.columns)
+    ['strain', 'mouse', 'day', 'row', 'col', 'occupancy']
+    """
+    labels, occupancy = cell_occupancy(movement, xbins, ybins)
+    flat = occupancy.reshape((len(occupancy), -1))
+    cell = flat.argmax(axis=1)
+    total = flat.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = flat[np.arange(len(flat)), cell] / total
+    home_base = pd.DataFrame(labels, columns=["strain", "mouse", "day"])
+    home_base["row"] = cell // xbins
+    home_base["col"] = cell % xbins
+    home_base["occupancy"] = fraction
+    return home_base
+
+
+def home_base_excursions(movement=None, xbins=2, ybins=4,
+                         use_sensor=False):
+    r"""
+    Return every excursion out of the home base for all mousedays:
+    the time the mouse left the home base, the time it came back and
+    the duration in between.
+
+    The exit time is the first observation outside the home base and
+    the entry time the first observation back in it. Excursions still
+    running at the end of a mouseday are left out.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame, optional
+        movement of many mousedays as returned by
+        ``data.load_all_movement``, loaded if not given
+    xbins : int
+        positive integer, number of cells along the x axis
+    ybins : int
+        positive integer, number of cells along the y axis
+    use_sensor : bool
+        use the isHB column recorded by the sensor instead of the cell
+        found by ``detect_home_base``
+
+    Returns
+    -------
+    excursions : pandas.DataFrame
+        one row per excursion with columns strain, mouse, day,
+        exit_time, entry_time and duration
+
+    Examples
+    --------
+    >>> excursions = home_base_excursions()
+    >>> list(excursions.columns)
+    ['strain', 'mouse', 'day', 'exit_time', 'entry_time', 'duration']
+    """
+    if movement is None:
+        movement = data.load_all_movement()
+    labels, offsets = run_offsets(movement[["strain", "mouse", "day"]])
+    mouseday = np.repeat(np.arange(len(labels)), np.diff(offsets))
+    if use_sensor:
+        in_hb = np.asarray(movement["isHB"], dtype=bool)
+    else:
+        home_base = detect_home_base(movement, xbins, ybins)
+        cell = _sample_cells(movement, xbins, ybins)
+        hb_cell = np.asarray(home_base["row"] * xbins + home_base["col"])
+        in_hb = cell == hb_cell[mouseday]
+
+    # changes of home base status within a mouseday
+    same_day = mouseday[1:] == mouseday[:-1]
+    exits = np.flatnonzero(same_day & in_hb[:-1] & ~in_hb[1:]) + 1
+    entries = np.flatnonzero(same_day & ~in_hb[:-1] & in_hb[1:]) + 1
+    # pair each exit with the first entry after it on the same day
+    nxt = np.searchsorted(entries, exits)
+    has_entry = nxt < len(entries)
+    nxt = np.minimum(nxt, max(len(entries) - 1, 0))
+    if len(entries):
+        has_entry &= mouseday[entries[nxt]] == mouseday[exits]
+    exits, entries = exits[has_entry], entries[nxt[has_entry]]
+
+    t = np.asarray(movement["t"])
+    excursions = pd.DataFrame(labels[mouseday[exits]],
+                              columns=["strain", "mouse", "day"])
+    excursions["exit_time"] = t[exits]
+    excursions["entry_time"] = t[entries]
+    excursions["duration"] = t[entries] - t[exits]
+    return excursions
+
+
+def _sample_cells(movement, xbins, ybins):
+    """
+    Return the flat index row * xbins + col of the grid cell of every
+    observation, binned as in ``cell_occupancy``.
+    """
+    xmin, xmax = CAGE_XLIMS
+    ymin, ymax = CAGE_YLIMS
+    meshx = xmin + (xmax - xmin) * 1. * np.arange(1, xbins + 1) / xbins
+    meshy = ymin + (ymax - ymin) * 1. * np.arange(1, ybins + 1) / ybins
+    col = np.minimum(meshx.searchsorted(movement["x"], side='right'),
+                     xbins - 1)
+    row = ybins - 1 - np.minimum(
+        meshy.searchsorted(movement["y"], side='right'), ybins - 1)
+    return row * xbins + col
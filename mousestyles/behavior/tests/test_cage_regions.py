@@ -0,0 +1,70 @@
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mousestyles.behavior import cage_regions
+
+
+def _movement():
+    # two mousedays: the first one goes from the niche to the food, the
+    # open floor, the water and back to the niche; the second one from
+    # the open floor to the food
+    movement = pd.DataFrame({
+        "strain": [0] * 7 + [1] * 3,
+        "mouse": [0] * 10,
+        "day": [0] * 10,
+        "t": [0., 10., 11., 13., 14., 15., 20., 0., 5., 6.],
+        "x": [-8., -8., -14., -14., -8., 0., -8., -8., -8., -12.],
+        "y": [38., 38., 2., 2., 20., 5., 38., 20., 20., 3.],
+        "isHB": [True, True, False, False, False, False, True, False,
+                 False, False]})
+    return movement[["strain", "mouse", "day", "t", "x", "y", "isHB"]]
+
+
+def test_label_regions():
+    region = cage_regions.label_regions(_movement())
+    np.testing.assert_array_equal(region, [0, 0, 1, 1, 3, 2, 0, 3, 3, 1])
+    # the home base sensor takes precedence
+    movement = _movement()
+    movement["isHB"] = True
+    assert (cage_regions.label_regions(movement) == 0).all()
+    with pytest.raises(ValueError) as excinfo:
+        cage_regions.label_regions(movement, food_region=((0, -1), (0, 1)))
+    expected = "lower limits must not exceed upper limits"
+    assert excinfo.value.args[0] == expected
+
+
+def test_region_visits():
+    visits = cage_regions.region_visits(_movement())
+    assert list(visits.columns) == ["strain", "mouse", "day", "region",
+                                    "start_time", "stop_time", "duration"]
+    np.testing.assert_array_equal(visits["region"], [0, 1, 3, 2, 0, 3, 1])
+    np.testing.assert_array_equal(visits["strain"], [0, 0, 0, 0, 0, 1, 1])
+    np.testing.assert_allclose(visits["duration"], [11, 3, 1, 5, 0, 6, 0])
+
+
+def test_region_transition_graph():
+    labels, counts, dwell = cage_regions.region_transition_graph(
+        _movement())
+    np.testing.assert_array_equal(labels, [[0, 0, 0], [1, 0, 0]])
+    assert counts.shape == (2, 4, 4)
+    expected = np.zeros((4, 4), dtype=int)
+    expected[0, 1] = expected[1, 3] = expected[3, 2] = expected[2, 0] = 1
+    np.testing.assert_array_equal(counts[0], expected)
+    # no transition between the last visit of a mouseday and the next one
+    assert counts[1].sum() == 1
+    assert counts[1, 3, 1] == 1
+    np.testing.assert_allclose(dwell["niche_time"], [11, 0])
+    np.testing.assert_array_equal(dwell["niche_visits"], [2, 0])
+    np.testing.assert_allclose(dwell["niche_mean_visit"][:1], [5.5])
+    assert np.isnan(dwell["niche_mean_visit"][1])
+
+    labels, counts, dwell = cage_regions.region_transition_graph(
+        _movement(), by="strain")
+    np.testing.assert_array_equal(labels, [[0], [1]])
+    assert list(dwell.columns[:2]) == ["strain", "niche_time"]
+    with pytest.raises(ValueError) as excinfo:
+        cage_regions.region_transition_graph(_movement(), by="mouse")
+    assert excinfo.value.args[0] == "by should be 'mouseday' or 'strain'"
@@ -0,0 +1,61 @@
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mousestyles.behavior import home_base
+
+
+def _movement():
+    # two mousedays; the first one sits in the back-left cell and leaves
+    # it twice, the second one sits in the front-right cell
+    movement = pd.DataFrame({
+        "strain": [0] * 6 + [1] * 3,
+        "mouse": [0] * 9,
+        "day": [0] * 9,
+        "t": [0., 10., 11., 12., 20., 21., 0., 5., 6.],
+        "x": [-15., -15., 0., -15., 0., -15., 0., 0., -15.],
+        "y": [40., 40., 5., 40., 40., 40., 5., 5., 40.],
+        "isHB": [True, True, False, True, False, False, True, True, True]})
+    return movement[["strain", "mouse", "day", "t", "x", "y", "isHB"]]
+
+
+def test_cell_occupancy():
+    labels, occupancy = home_base.cell_occupancy(_movement())
+    np.testing.assert_array_equal(labels, [[0, 0, 0], [1, 0, 0]])
+    assert occupancy.shape == (2, 4, 2)
+    assert occupancy[0, 0, 0] == 19.
+    assert occupancy[0, 3, 1] == 1.
+    assert occupancy[0, 0, 1] == 1.
+    assert occupancy[1, 3, 1] == 6.
+    assert occupancy.sum() == 27.
+
+
+def test_cell_occupancy_input():
+    with pytest.raises(TypeError) as excinfo:
+        home_base.cell_occupancy(_movement(), xbins=2.)
+    assert excinfo.value.args[0] == "xbins and ybins need to be integer"
+    with pytest.raises(ValueError) as excinfo:
+        home_base.cell_occupancy(_movement(), ybins=0)
+    assert excinfo.value.args[0] == "xbins and ybins need to be positive"
+
+
+def test_detect_home_base():
+    hb = home_base.detect_home_base(_movement())
+    np.testing.assert_array_equal(hb["row"], [0, 3])
+    np.testing.assert_array_equal(hb["col"], [0, 1])
+    np.testing.assert_allclose(hb["occupancy"], [19. / 21., 1.])
+
+
+def test_home_base_excursions():
+    excursions = home_base.home_base_excursions(_movement())
+    np.testing.assert_array_equal(excursions["strain"], [0, 0])
+    np.testing.assert_allclose(excursions["exit_time"], [11., 20.])
+    np.testing.assert_allclose(excursions["entry_time"], [12., 21.])
+    np.testing.assert_allclose(excursions["duration"], [1., 1.])
+    # by the sensor, the first day ends outside the home base
+    excursions = home_base.home_base_excursions(_movement(),
+                                                use_sensor=True)
+    np.testing.assert_allclose(excursions["exit_time"], [11.])
+    np.testing.assert_allclose(excursions["entry_time"], [12.])
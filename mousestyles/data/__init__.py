@@ -13,6 +13,45 @@ from matplotlib.externals import six
 
 INTERVAL_FEATURES = ["AS", "F", "IS", "M_AS", "M_IS", "W"]
 
+MOUSEDAY_FEATURES = [
+    "ASProbability",
+    "ASNumbers",
+    "ASDurations",
+    "Food",
+    "Water",
+    "Distance",
+    "ASFoodIntensity",
+    "ASWaterIntensity",
+    "MoveASIntensity"]
+
+# start hour of each of the 11 two-hour time bins
+MOUSEDAY_BINS = list(range(0, 22, 2))
+
+# (feature, hour) -> (feature index, column) in the mouseday feature tensor
+MOUSEDAY_COLUMNS = dict(
+    ((feature, hour), (i, 3 + j))
+    for (i, feature) in enumerate(MOUSEDAY_FEATURES)
+    for (j, hour) in enumerate(MOUSEDAY_BINS))
+
+_FEATURE_CHOICES = "{" + ", ".join(
+    '"' + item + '"' for item in MOUSEDAY_FEATURES) + "}"
+
+_mouseday_tensor = None
+
+
+def _load_mouseday_tensor():
+    """
+    Return the 9 x 1921 x (3 labels + 11 feature time bins) tensor of
+    mouseday features, memory-mapped read-only on first use and cached
+    for later calls.
+    """
+    global _mouseday_tensor
+    if _mouseday_tensor is None:
+        _mouseday_tensor = np.load(
+            _os.path.join(data_dir, "all_features_mousedays_11bins.npy"),
+            mmap_mode="r")
+    return _mouseday_tensor
+
 
 def load_all_features():
     """
@@ -32,22 +71,10 @@ def load_all_features():
     features_data_frame : pandas.DataFrame
         A dataframe of computed features.
     """
-    features = [
-        'ASProbability',
-        'ASNumbers',
-        'ASDurations',
-        'Food',
-        'Water',
-        'Distance',
-        'ASFoodIntensity',
-        'ASWaterIntensity',
-        'MoveASIntensity']
+    features = MOUSEDAY_FEATURES
 
     # 9 x 1921 x (3 labels + 11 feature time bins)
-    all_features = np.load(
-        _os.path.join(
-            data_dir,
-            'all_features_mousedays_11bins.npy'))
+    all_features = _load_mouseday_tensor()
 
     # Here we begin reshaping the 3-d numpy array into a pandas 2-d dataframe
     columns = ['strain', 'mouse', 'day']
@@ -103,63 +130,101 @@ def load_mouseday_features(features=None):
     >>> mouseday = load_mouseday_features(["Food"])
     >>> mouseday = load_mouseday_features(["Food", "Water", "Distance"])
     """
-    features_list = [
-        "ASProbability",
-        "ASNumbers",
-        "ASDurations",
-        "Food",
-        "Water",
-        "Distance",
-        "ASFoodIntensity",
-        "ASWaterIntensity",
-        "MoveASIntensity"]
-
     if features is None:
-        features = features_list
+        features = MOUSEDAY_FEATURES
 
     if type(features) is str:
         features = [features]
 
-    fea_str = "{"
-    for item in features_list:
-        fea_str += '"' + item + '", '
-    fea_str = fea_str[:-2] + "}"
+    labels, values = project_mouseday_features(features)
+
+    # Prepare column names
+    columns = ["strain", "mouse", "day"]
+    for feature in features:
+        columns += [feature + "_" + str(x) for x in MOUSEDAY_BINS]
+    # Transform into data frame
+    data_all = pd.DataFrame(np.hstack([labels, values]), columns=columns)
+
+    return data_all
+
+
+def project_mouseday_features(features=None, bins=None, strains=None):
+    """
+    Returns the labels and the values of any subset of the mouseday
+    features, time bins and strains, read from a tensor that is loaded
+    once and memory-mapped.
+
+    The values are gathered with a single fancy index (or returned as a
+    read-only view when one whole feature is requested), with columns
+    ordered feature by feature and, within a feature, by time bin.
+    MOUSEDAY_COLUMNS maps a (feature, hour) pair to its location in the
+    underlying tensor in constant time.
+
+    Parameters
+    ----------
+    features: list, optional
+        features chosen from MOUSEDAY_FEATURES, default all of them
+    bins: list, optional
+        start hours of the 2-hour time bins chosen from
+        {0, 2, ..., 20}, default all of them
+    strains: list, optional
+        strain numbers to keep, default all strains
+
+    Returns
+    -------
+    labels: numpy.ndarray
+        (n, 3) array of strain, mouse and day of each selected row
+    values: numpy.ndarray
+        (n, len(features) * len(bins)) array of feature values
+
+    Examples
+    --------
+    >>> labels, values = project_mouseday_features(["Food"], [0, 2])
+    >>> values.shape
+    (1921, 2)
+    """
+    if features is None:
+        features = MOUSEDAY_FEATURES
+    if bins is None:
+        bins = MOUSEDAY_BINS
 
     # Check if input is a list
-    if type(features) is not list:
+    if type(features) is not list or type(bins) is not list:
         raise TypeError(
             "Input value must be a list."
         )
 
-    # Check if input values are expected features
+    # Check if input values are expected features and bins
     for feature in features:
-        if feature not in features_list:
+        if feature not in MOUSEDAY_FEATURES:
             raise ValueError(
-                "Input value must be chosen from " + fea_str + "."
+                "Input value must be chosen from " + _FEATURE_CHOICES + "."
+            )
+    for hour in bins:
+        if hour not in MOUSEDAY_BINS:
+            raise ValueError(
+                "Time bins must be chosen from {0, 2, ..., 20}."
             )
 
-    # 9 x 1921 x (3 labels + 11 feature time bins)
-    all_features = np.load(
-        _os.path.join(
-            data_dir,
-            "all_features_mousedays_11bins.npy"))
-
-    # Locate each feature and aggregate numpy arrays
-    dic = {}
-    for (i, feature) in enumerate(features_list):
-        dic[feature] = i
-    all_data_orig = np.hstack(
-        [all_features[0, :, 0:3]] +
-        [all_features[dic[feature], :, 3:] for feature in features])
-
-    # Prepare column names
-    columns = ["strain", "mouse", "day"]
-    for feature in features:
-        columns += [feature + "_" + str(x) for x in range(0, 22, 2)]
-    # Transform into data frame
-    data_all = pd.DataFrame(all_data_orig, columns=columns)
-
-    return data_all
+    all_features = _load_mouseday_tensor()
+    labels = all_features[0, :, 0:3]
+    if strains is None:
+        if len(features) == 1 and bins == MOUSEDAY_BINS:
+            feature_index = MOUSEDAY_COLUMNS[features[0], 0][0]
+            return labels, all_features[feature_index, :, 3:]
+        rows = np.arange(labels.shape[0])
+    else:
+        strains = np.atleast_1d(strains)
+        rows = np.flatnonzero(
+            np.any(labels[:, 0, np.newaxis] == strains, axis=1))
+        labels = labels[rows]
+
+    index = np.array([MOUSEDAY_COLUMNS[feature, hour]
+                      for feature in features for hour in bins],
+                     dtype=int).reshape((-1, 2))
+    values = all_features[index[np.newaxis, :, 0], rows[:, np.newaxis],
+                          index[np.newaxis, :, 1]]
+    return labels, values
 
 
 def load_intervals(feature):
@@ -285,6 +350,72 @@ def load_movement(strain, mouse, day):
     return dt
 
 
+def load_mouseday_labels():
+    """
+    Return a numpy array with one row (strain, mouse, day) for every
+    mouseday that has movement data, sorted by strain, mouse and day.
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        (137, 3) integer array of strain, mouse and day numbers
+
+    Examples
+    --------
+    >>> labels = load_mouseday_labels()
+    >>> labels[0]
+    array([0, 0, 0])
+    """
+    file_names = _os.listdir(_os.path.join(data_dir, "txy_coords", "CT"))
+    labels = []
+    for item in file_names:
+        strain = int(item.split("strain")[1].split("_mouse")[0])
+        mouse = int(item.split("mouse")[1].split("_day")[0])
+        day = int(item.split("day")[1].split(".npy")[0])
+        labels.append((strain, mouse, day))
+    return np.array(sorted(labels), dtype=int).reshape((-1, 3))
+
+
+def load_all_movement():
+    """
+    Return a pandas.DataFrame object holding the movement data of every
+    mouseday, one mouseday after the other in the order given by
+    load_mouseday_labels.
+
+    There are 7 columns in the dataframe: strain, mouse and day identify
+    the mouseday, and t, x, y and isHB are the columns of load_movement.
+    Rows of one mouseday are contiguous, so the whole dataset can be
+    processed in one vectorized pass and split back into mousedays with
+    utils.run_offsets.
+
+    Returns
+    -------
+    movement : pandas.DataFrame
+        strain, mouse, day, CT, CX, CY coordinates and home base status
+        of all mousedays
+
+    Examples
+    --------
+    >>> movement = load_all_movement()
+    >>> groups, offsets = utils.run_offsets(
+    ...     movement[["strain", "mouse", "day"]])
+    """
+    labels = load_mouseday_labels()
+    columns = dict((c, []) for c in ["t", "x", "y", "isHB"])
+    lengths = np.zeros(len(labels), dtype=int)
+    for i, (strain, mouse, day) in enumerate(labels):
+        movement = load_movement(int(strain), int(mouse), int(day))
+        for c in columns:
+            columns[c].append(np.asarray(movement[c]))
+        lengths[i] = len(movement)
+    dt = pd.DataFrame()
+    for (j, c) in enumerate(["strain", "mouse", "day"]):
+        dt[c] = np.repeat(labels[:, j], lengths)
+    for c in ["t", "x", "y", "isHB"]:
+        dt[c] = np.concatenate(columns[c])
+    return dt
+
+
 def _lookup_intervals(times, intervals):
     """
     Return a boolean array where each element is True
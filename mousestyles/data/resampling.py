@@ -0,0 +1,225 @@
+"""Seeded, vectorized resampling of mouse days.
+
+Every function here works on an (M x K) array of labels whose first column
+is the strain number and second column the mouse number (as returned in the
+first columns of ``load_mouseday_features``), and lazily yields index
+arrays into its rows.  Apply them to the feature matrix only when needed,
+e.g. ``features[idx]``; nothing is copied by the generators themselves.
+
+Splits are drawn in blocks of ``chunk_size`` at a time with one sort per
+block, so generating hundreds of splits costs a handful of vectorized calls.
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import numbers
+
+import numpy as np
+
+from mousestyles.data.utils import _group_starts
+
+
+def check_random_state(seed):
+    """
+    Turn `seed` into a numpy.random.RandomState instance.
+
+    Parameters
+    ----------
+    seed: None, int or numpy.random.RandomState
+        If None, return the global random state used by ``np.random``.
+        If int, return a new RandomState seeded with it.
+        If already a RandomState, return it unchanged.
+
+    Returns
+    -------
+    random_state: numpy.random.RandomState
+
+    Examples
+    --------
+    >>> rng = check_random_state(0)
+    >>> check_random_state(rng) is rng
+    True
+    """
+    if seed is None or seed is np.random:
+        return np.random.mtrand._rand
+    if isinstance(seed, (numbers.Integral, np.integer)):
+        return np.random.RandomState(seed)
+    if isinstance(seed, np.random.RandomState):
+        return seed
+    raise ValueError("seed must be None, an int or a RandomState")
+
+
+def _sorted_groups(keys):
+    """
+    Return (order, group_id, starts, sizes) for the rows of `keys`,
+    where group_id is the group of each row in sorted order.
+    """
+    order, starts = _group_starts(keys)
+    sizes = np.diff(np.append(starts, len(order)))
+    group_id = np.repeat(np.arange(len(starts)), sizes)
+    return order, group_id, starts, sizes
+
+
+def _check_labels(labels, n_columns=2):
+    labels = np.asarray(labels)
+    if labels.ndim != 2 or labels.shape[1] < n_columns:
+        raise ValueError("labels must be a 2-d array with strain and mouse "
+                         "columns")
+    return labels
+
+
+def _chunks(n_total, chunk_size):
+    if type(n_total) != int or n_total <= 0:
+        raise ValueError("number of resamples should be positive int")
+    if type(chunk_size) != int or chunk_size <= 0:
+        raise ValueError("chunk_size should be positive int")
+    done = 0
+    while done < n_total:
+        size = min(chunk_size, n_total - done)
+        yield size
+        done += size
+
+
+def stratified_half_splits(labels, n_splits=1, seed=None, chunk_size=100):
+    r"""
+    Yield random halvings of the mouse days that keep every mouse with
+    at least two days represented on both sides.
+
+    The mice are put in a random order and the days of each mouse are
+    shuffled; the days are then dealt alternately to the two halves in
+    that order. The days of a mouse are dealt in a row, so a mouse with
+    two days or more appears in both halves, and the sizes of the halves
+    differ by at most one. A mouse with a single day falls in one half
+    only, either one with equal probability.
+
+    Parameters
+    ----------
+    labels: numpy.ndarray
+        (M x K) labels, strain in column 0 and mouse in column 1
+    n_splits: int
+        number of splits to generate
+    seed: None, int or numpy.random.RandomState
+        source of randomness, see ``check_random_state``
+    chunk_size: int
+        number of splits drawn per vectorized block
+
+    Yields
+    ------
+    (idx_1, idx_2): tuple of numpy.ndarray
+        row indices of the two halves
+
+    Examples
+    --------
+    >>> labels = np.array([[0, 0], [0, 0], [0, 1], [0, 1]])
+    >>> for idx_1, idx_2 in stratified_half_splits(labels, 2, seed=0):
+    ...     print(sorted(labels[idx_1, 1].tolist()))
+    [0, 1]
+    [0, 1]
+    """
+    labels = _check_labels(labels)
+    rng = check_random_state(seed)
+    order, group_id, starts, _ = _sorted_groups(labels[:, :2])
+    for size in _chunks(n_splits, chunk_size):
+        # a random rank for every mouse, so that the side of the odd day
+        # of a mouse does not depend on the mice sorted before it
+        ranks = np.argsort(rng.random_sample((size, len(starts))), axis=1)
+        # sorting rank + U(0, 1) shuffles within mice only
+        keys = (np.take(ranks, group_id, axis=1) +
+                rng.random_sample((size, len(order))))
+        perms = order[np.argsort(keys, axis=1)]
+        for perm in perms:
+            yield perm[::2], perm[1::2]
+
+
+def kfold_by_mouse(labels, n_folds=5, seed=None):
+    r"""
+    Yield train/test splits in which every mouse is held out exactly once,
+    with all of its days on the same side.
+
+    Mice are shuffled within each strain and dealt to the folds in turn,
+    so every fold holds out a similar number of mice of each strain.
+
+    Parameters
+    ----------
+    labels: numpy.ndarray
+        (M x K) labels, strain in column 0 and mouse in column 1
+    n_folds: int
+        number of folds, at least 2
+    seed: None, int or numpy.random.RandomState
+        source of randomness, see ``check_random_state``
+
+    Yields
+    ------
+    (train, test): tuple of numpy.ndarray
+        row indices of the training and held-out days
+
+    Examples
+    --------
+    >>> labels = np.array([[0, 0], [0, 1], [0, 1], [1, 0]])
+    >>> folds = [test for _, test in kfold_by_mouse(labels, 2, seed=0)]
+    >>> sorted(np.concatenate(folds).tolist())
+    [0, 1, 2, 3]
+    """
+    labels = _check_labels(labels)
+    if type(n_folds) != int or n_folds < 2:
+        raise ValueError("n_folds should be int larger than 1")
+    rng = check_random_state(seed)
+
+    # one row per mouse, then one group per strain among the mice
+    order, mouse_id, mouse_starts, _ = _sorted_groups(labels[:, :2])
+    mice = labels[order[mouse_starts], :2]
+    _, strain_id, strain_starts, _ = _sorted_groups(mice[:, :1])
+    shuffled = np.argsort(strain_id + rng.random_sample(len(mice)))
+    rank = np.arange(len(mice)) - strain_starts[strain_id]
+    offset = rng.randint(n_folds, size=len(strain_starts))
+    mouse_fold = np.empty(len(mice), dtype=int)
+    mouse_fold[shuffled] = (rank + offset[strain_id]) % n_folds
+
+    fold = np.empty(len(labels), dtype=int)
+    fold[order] = mouse_fold[mouse_id]
+    for k in range(n_folds):
+        yield np.flatnonzero(fold != k), np.flatnonzero(fold == k)
+
+
+def bootstrap_indices(labels, n_boot=1, by_mouse=False, seed=None,
+                      chunk_size=100):
+    r"""
+    Yield bootstrap replicates of the mouse days, resampled with
+    replacement within each strain (or within each mouse).
+
+    Parameters
+    ----------
+    labels: numpy.ndarray
+        (M x K) labels, strain in column 0 and mouse in column 1
+    n_boot: int
+        number of replicates to generate
+    by_mouse: bool
+        resample within each mouse instead of within each strain
+    seed: None, int or numpy.random.RandomState
+        source of randomness, see ``check_random_state``
+    chunk_size: int
+        number of replicates drawn per vectorized block
+
+    Yields
+    ------
+    idx: numpy.ndarray
+        M row indices, grouped by strain (and mouse)
+
+    Examples
+    --------
+    >>> labels = np.array([[0, 0], [0, 1], [1, 0]])
+    >>> idx = next(bootstrap_indices(labels, seed=0))
+    >>> labels[idx, 0].tolist()
+    [0, 0, 1]
+    """
+    labels = _check_labels(labels)
+    rng = check_random_state(seed)
+    n_keys = 2 if by_mouse else 1
+    order, group_id, starts, sizes = _sorted_groups(labels[:, :n_keys])
+    row_start = starts[group_id]
+    row_size = sizes[group_id]
+    for size in _chunks(n_boot, chunk_size):
+        draws = rng.random_sample((size, len(order)))
+        pos = row_start + (draws * row_size).astype(int)
+        for idx in order[pos]:
+            yield idx
@@ -7,6 +7,7 @@ from __future__ import (absolute_import, division, print_function,
 import pytest
 
 import mousestyles.data as data
+from mousestyles.data.utils import run_offsets
 import numpy as np
 import pandas as pd
 
@@ -29,6 +30,36 @@ def test_mouseday_features_loader():
     assert mouseday_features3.shape == (1921, 102)
 
 
+def test_project_mouseday_features():
+    labels, values = data.project_mouseday_features()
+    assert labels.shape == (1921, 3)
+    assert values.shape == (1921, 99)
+    # a whole feature is returned without copying
+    labels, food = data.project_mouseday_features(["Food"])
+    assert food.shape == (1921, 11)
+    assert not food.flags.owndata
+    labels, values = data.project_mouseday_features(
+        ["Water", "Food"], [4, 0], strains=[1, 3])
+    assert set(labels[:, 0]) == set([1, 3])
+    mouseday = data.load_mouseday_features(["Food", "Water"])
+    mouseday = mouseday[mouseday["strain"].isin([1, 3])]
+    np.testing.assert_allclose(
+        values, mouseday[["Water_4", "Water_0", "Food_4", "Food_0"]])
+    i, j = data.MOUSEDAY_COLUMNS["Food", 4]
+    np.testing.assert_allclose(
+        data._load_mouseday_tensor()[i, :, j], food[:, 2])
+
+
+def test_project_mouseday_input():
+    with pytest.raises(ValueError) as excinfo:
+        data.project_mouseday_features(["Food"], [1])
+    assert excinfo.value.args[0] == \
+        "Time bins must be chosen from {0, 2, ..., 20}."
+    with pytest.raises(TypeError) as excinfo:
+        data.project_mouseday_features(["Food"], 2)
+    assert excinfo.value.args[0] == "Input value must be a list."
+
+
 def test_intervals_loader():
     # Checking load_intervals returns a data frame of the correct dimension
     AS = data.load_intervals('AS')
@@ -153,3 +184,17 @@ def max_speed_bymouse():
 def max_speed_bystrain():
     # Max speed of a mouse should be less than 40 km/h
     assert max(data.distances_bystrain(0, step=50) * 3.6 / 100) < 40
+
+
+def test_all_movement_loader():
+    labels = data.load_mouseday_labels()
+    assert labels.shape == (137, 3)
+    movement = data.load_all_movement()
+    assert list(movement.columns) == ["strain", "mouse", "day",
+                                      "t", "x", "y", "isHB"]
+    groups, offsets = run_offsets(movement[["strain", "mouse", "day"]])
+    np.testing.assert_array_equal(groups, labels)
+    m = data.load_movement(0, 0, 1)
+    first = movement.iloc[offsets[1]:offsets[2]]
+    np.testing.assert_allclose(first["t"], m["t"])
+    np.testing.assert_array_equal(first["isHB"], m["isHB"])
@@ -0,0 +1,91 @@
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import pytest
+
+from mousestyles.data import resampling
+from mousestyles.data.utils import split_data_in_half_randomly
+
+
+LABELS = np.array([[0, 0], [0, 0], [0, 1], [0, 1], [0, 1],
+                   [1, 0], [1, 0], [1, 3], [1, 3], [1, 3]])
+
+
+def test_check_random_state():
+    rng = resampling.check_random_state(1)
+    assert resampling.check_random_state(rng) is rng
+    assert resampling.check_random_state(None) is np.random.mtrand._rand
+    with pytest.raises(ValueError) as excinfo:
+        resampling.check_random_state('a')
+    assert excinfo.value.args[0] == \
+        "seed must be None, an int or a RandomState"
+
+
+def test_stratified_half_splits():
+    splits = list(resampling.stratified_half_splits(LABELS, 7, seed=0,
+                                                    chunk_size=3))
+    assert len(splits) == 7
+    for idx_1, idx_2 in splits:
+        # a partition of the rows, and every mouse appears in both halves
+        np.testing.assert_array_equal(
+            np.sort(np.concatenate([idx_1, idx_2])), np.arange(len(LABELS)))
+        for half in (idx_1, idx_2):
+            assert len(set(map(tuple, LABELS[half]))) == 4
+    again = list(resampling.stratified_half_splits(LABELS, 7, seed=0,
+                                                   chunk_size=3))
+    for (a, _), (b, _) in zip(splits, again):
+        np.testing.assert_array_equal(a, b)
+    with pytest.raises(ValueError) as excinfo:
+        next(resampling.stratified_half_splits(LABELS, 0))
+    assert excinfo.value.args[0] == \
+        "number of resamples should be positive int"
+
+
+def test_stratified_half_splits_single_day():
+    # mouse (0, 2) and (1, 1) have a single day
+    labels = np.array([[0, 0], [0, 0], [0, 2], [1, 0], [1, 0], [1, 0],
+                       [1, 1]])
+    sides = {(0, 2): set(), (1, 1): set()}
+    for idx_1, idx_2 in resampling.stratified_half_splits(labels, 50,
+                                                          seed=0):
+        assert abs(len(idx_1) - len(idx_2)) <= 1
+        for side, half in enumerate((idx_1, idx_2)):
+            mice = set(map(tuple, labels[half]))
+            assert {(0, 0), (1, 0)} <= mice
+            for mouse in sides:
+                if mouse in mice:
+                    sides[mouse].add(side)
+    # single days fall in either half
+    assert sides == {(0, 2): {0, 1}, (1, 1): {0, 1}}
+
+
+def test_kfold_by_mouse():
+    tested = []
+    for train, test in resampling.kfold_by_mouse(LABELS, 2, seed=3):
+        assert not set(map(tuple, LABELS[train])) & \
+            set(map(tuple, LABELS[test]))
+        # each fold holds out one mouse of each strain
+        assert sorted(set(LABELS[test, 0])) == [0, 1]
+        tested.append(test)
+    np.testing.assert_array_equal(np.sort(np.concatenate(tested)),
+                                  np.arange(len(LABELS)))
+    with pytest.raises(ValueError) as excinfo:
+        next(resampling.kfold_by_mouse(LABELS, 1))
+    assert excinfo.value.args[0] == "n_folds should be int larger than 1"
+
+
+def test_bootstrap_indices():
+    for idx in resampling.bootstrap_indices(LABELS, 5, seed=0):
+        np.testing.assert_array_equal(LABELS[idx, 0], LABELS[:, 0])
+    for idx in resampling.bootstrap_indices(LABELS, 5, by_mouse=True,
+                                            seed=0):
+        np.testing.assert_array_equal(LABELS[idx], LABELS)
+
+
+def test_split_data_in_half_randomly():
+    features = np.arange(len(LABELS) * 2).reshape((len(LABELS), 2))
+    data_1, labels_1, data_2, labels_2 = split_data_in_half_randomly(
+        features, LABELS, seed=0)
+    assert len(data_1) + len(data_2) == len(LABELS)
+    np.testing.assert_array_equal(LABELS[data_1[:, 0] // 2], labels_1)
+    np.testing.assert_array_equal(LABELS[data_2[:, 0] // 2], labels_2)
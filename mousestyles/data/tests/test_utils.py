@@ -2,8 +2,14 @@ from __future__ import print_function, absolute_import, division
 
 import numpy as np
 
-from mousestyles.data.utils import (pull_locom_tseries_subset,
-                                    total_time_rectangle_bins)
+from mousestyles.data.utils import (day_to_mouse_average, group_aggregate,
+                                    idx_restrict_to_rectangles,
+                                    mouse_to_strain_average,
+                                    pull_locom_tseries_subset,
+                                    pull_locom_tseries_windows,
+                                    total_distance_windows,
+                                    total_time_rectangle_bins,
+                                    total_time_rectangle_bins_windows)
 
 
 def test_pull_locom():
@@ -54,3 +60,80 @@ def test_total_time():
     TT = total_time_rectangle_bins(M, xbins=3, ybins=5)
     np.testing.assert_allclose(TT, [[0., 0., 0.], [0., 0., 0.],
                                     [0., 0., 0.], [0., 1., 0.], [0., 0., 0.]])
+
+
+def test_idx_restrict_to_rectangles():
+    # back-left and front-right cells of the 2 x 4 grid
+    TXY = np.array([[1, 2, 3, 4, 5], [-10, 0, -10, 0, -6.25],
+                    [40, 5, 5, 40, 40]])
+    idx = idx_restrict_to_rectangles(TXY, rects=[(0, 0), (3, 1)])
+    np.testing.assert_array_equal(idx, [True, True, False, False, False])
+
+
+def test_pull_locom_windows():
+    M = np.array([[1, 2, 3, 4, 5, 6], [8, 7, 6, 5, 5, 4], [-1, 3, 4, 1, 1, 4]])
+    windows = [(1, 4), (1, 3.4), (1.2, 3.4), (0, 5), (1.2, 1.5), (1, 7),
+               (7, 8)]
+    new_M, offsets = pull_locom_tseries_windows(M, windows)
+    assert len(offsets) == len(windows) + 1
+    for i, (start, stop) in enumerate(windows):
+        np.testing.assert_allclose(
+            new_M[:, offsets[i]:offsets[i + 1]],
+            pull_locom_tseries_subset(M, start_time=start, stop_time=stop))
+
+
+def test_total_time_windows():
+    M = np.array([[1, 2, 3, 4, 5, 6],
+                  [.51, .61, .11, .81, .21, .3],
+                  [.3, .41, .6, .1, .1, .1]])
+    windows = [(1, 3.5), (2.5, 6), (6.5, 8)]
+    new_M, offsets = pull_locom_tseries_windows(M, windows)
+    TT = total_time_rectangle_bins_windows(new_M, offsets, xbins=3, ybins=5)
+    assert TT.shape == (3, 5, 3)
+    for i, (start, stop) in enumerate(windows):
+        sub = pull_locom_tseries_subset(M, start_time=start, stop_time=stop)
+        np.testing.assert_allclose(
+            TT[i], total_time_rectangle_bins(sub, xbins=3, ybins=5))
+    dist = total_distance_windows(new_M, offsets)
+    sub = pull_locom_tseries_subset(M, start_time=2.5, stop_time=6)
+    np.testing.assert_allclose(
+        dist[1], np.sum(np.sqrt(np.diff(sub[1]) ** 2 + np.diff(sub[2]) ** 2)))
+    assert dist[2] == 0
+
+
+def test_group_aggregate():
+    values = np.array([[1., 10.], [3., 30.], [5., 50.], [2., 20.]])
+    keys = np.array([[1, 0], [0, 1], [1, 0], [0, 1]])
+    groups, mean, std, stderr, count = group_aggregate(values, keys)
+    np.testing.assert_array_equal(groups, [[0, 1], [1, 0]])
+    np.testing.assert_allclose(mean, [[2.5, 25.], [3., 30.]])
+    np.testing.assert_allclose(std, [[.5, 5.], [2., 20.]])
+    np.testing.assert_allclose(stderr, [[.5, 5.], [2., 20.]])
+    np.testing.assert_array_equal(count, [2, 2])
+
+    groups, mean, std, _, count = group_aggregate(
+        values[:, 0], keys[:, 0], weights=[1, 1, 3, 1])
+    np.testing.assert_array_equal(groups, [0, 1])
+    np.testing.assert_allclose(mean, [2.5, 4.])
+    np.testing.assert_allclose(std, [.5, np.sqrt(3.)])
+
+
+def test_group_aggregate_empty():
+    groups, mean, std, stderr, count = group_aggregate(np.zeros((0, 2)),
+                                                       np.zeros((0, 3)))
+    assert groups.shape == (0, 3)
+    assert mean.shape == std.shape == stderr.shape == (0, 2)
+    assert count.shape == (0,)
+    groups, mean, std, stderr, count = group_aggregate([], [])
+    assert groups.shape == mean.shape == count.shape == (0,)
+
+
+def test_strain_average():
+    features = np.array([[1., 2.], [3., 4.], [5., 6.]])
+    labels = np.array([[0, 0, 0], [0, 0, 1], [1, 2, 0]])
+    mouse_avg = day_to_mouse_average(features, labels, num_strains=2)
+    np.testing.assert_allclose(mouse_avg, [[0, 0, 2., 3.], [1, 2, 5., 6.]])
+    strain_avg = mouse_to_strain_average(mouse_avg[:, 2:], mouse_avg[:, :2],
+                                         num_strains=3)
+    np.testing.assert_allclose(strain_avg[:2], [[2., 3.], [5., 6.]])
+    assert np.all(np.isnan(strain_avg[2]))
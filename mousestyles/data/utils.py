@@ -5,6 +5,99 @@ from __future__ import print_function, absolute_import, division
 import numpy as np
 
 
+def group_aggregate(values, keys, weights=None):
+    """
+    given an (M x N) array of values and an (M x K) array of grouping keys
+    (e.g. strain, mouse, day or time bin columns), computes the mean,
+    standard deviation, standard error and size of every group in one pass
+
+    groups are sorted lexicographically by key, so the output order is
+    deterministic.  if weights (length M) are given, the mean and standard
+    deviation are weighted; the standard error always uses the number of
+    rows, as std / sqrt(count - 1) like the averaging functions below.
+
+    Returns:
+        groups: (G x K) array of distinct keys
+        mean, std, stderr: (G x N) arrays
+        count: length G array of rows per group
+    """
+    values = np.asarray(values, dtype=float)
+    keys = np.asarray(keys)
+    one_value = values.ndim == 1
+    one_key = keys.ndim == 1
+    # explicit widths, as -1 cannot be inferred for zero rows
+    values = values.reshape((values.shape[0],
+                             int(np.prod(values.shape[1:]))))
+    keys = keys.reshape((keys.shape[0], int(np.prod(keys.shape[1:]))))
+    if weights is None:
+        weights = np.ones(values.shape[0])
+    else:
+        weights = np.asarray(weights, dtype=float)
+        if weights.shape != (values.shape[0],):
+            raise ValueError("weights must have one entry per row")
+
+    if values.shape[0] == 0:
+        groups = keys[:, 0] if one_key else keys
+        empty = values[:, 0] if one_value else values
+        return (groups, empty.copy(), empty.copy(), empty.copy(),
+                np.zeros(0, dtype=int))
+
+    order, starts = _group_starts(keys)
+    groups = keys[order[starts]]
+    count = np.diff(np.append(starts, len(order)))
+    group_id = np.repeat(np.arange(len(starts)), count)
+    sorted_values = values[order]
+    sorted_weights = weights[order][:, np.newaxis]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight_sum = np.add.reduceat(sorted_weights, starts, axis=0)
+        mean = np.add.reduceat(sorted_weights * sorted_values, starts,
+                               axis=0) / weight_sum
+        dev = sorted_values - mean[group_id]
+        std = np.sqrt(np.add.reduceat(sorted_weights * dev ** 2, starts,
+                                      axis=0) / weight_sum)
+        stderr = std / np.sqrt(count - 1)[:, np.newaxis]
+
+    if one_key:
+        groups = groups[:, 0]
+    if one_value:
+        mean, std, stderr = mean[:, 0], std[:, 0], stderr[:, 0]
+    return groups, mean, std, stderr, count
+
+
+def _group_starts(keys):
+    """
+    returns (order, starts): order sorts the rows of the (M x K) keys
+    lexicographically, and starts indexes the first sorted row of each
+    group of identical keys
+    """
+    if len(keys) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    order = np.lexsort(keys.T[::-1])
+    sorted_keys = keys[order]
+    change = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+    starts = np.flatnonzero(np.append(True, change))
+    return order, starts
+
+
+def run_offsets(keys):
+    """
+    given an (M x K) array of keys in which equal rows are contiguous, e.g.
+    the strain, mouse and day columns of data.load_all_movement
+
+    returns (groups, offsets) where groups is the (G x K) array of keys in
+    order of appearance and offsets is a length G + 1 array such that
+    group g is rows offsets[g]:offsets[g + 1]
+    """
+    keys = np.asarray(keys)
+    keys = keys.reshape((keys.shape[0], -1))
+    if len(keys) == 0:
+        return keys, np.zeros(1, dtype=int)
+    change = np.any(keys[1:] != keys[:-1], axis=1)
+    starts = np.flatnonzero(np.append(True, change))
+    return keys[starts], np.append(starts, len(keys))
+
+
 def day_to_mouse_average(features, labels, num_strains=16,
                          stdev=False, stderr=False):
     """
@@ -13,57 +106,21 @@ def day_to_mouse_average(features, labels, num_strains=16,
 
     Returns:
         new data matrix with a mean and stdev/stderr for each mouse over
-        mouse days
+        mouse days, ordered by strain then mouse
     """
 
     data = np.hstack([labels, features])
-    tot_data_avgs = np.zeros((1, data.shape[1] - 1))
-    tot_data_std = np.zeros((1, data.shape[1] - 1))
-    tot_data_stderr = np.zeros((1, data.shape[1] - 1))
-
-    for strain in range(0, num_strains):
-        mice = {}
-        cnt = 0
-        tmp_data = data[data[:, 0] == strain, :]
-
-        for i in range(tmp_data.shape[0]):
-            if tmp_data[i, 1] in mice:
-                mice[tmp_data[i, 1]] += 1
-            else:
-                cnt += 1
-                mice[tmp_data[i, 1]] = 1
-        data_avgs = np.zeros((len(mice), data.shape[1] - 1))
-        data_std = np.zeros((len(mice), data.shape[1] - 1))
-        data_stderr = np.zeros((len(mice), data.shape[1] - 1))
-
-        for c, num in enumerate(mice.keys()):
-            mouse_arr = tmp_data[tmp_data[:, 1] == num, 0:]
-            mouse_avg = mouse_arr[:, 3:].mean(axis=0)
-            mouse_std = mouse_arr[:, 3:].std(axis=0)
-            # standard error for plot
-            mouse_stderr = mouse_arr[:, 3:].std(
-                axis=0) / np.sqrt(mouse_arr.shape[0] - 1)
-
-            data_avgs[c, 0:2] = mouse_arr[0, 0:2]
-            data_avgs[c, 2:] = mouse_avg
-
-            data_std[c, 0:2] = mouse_arr[0, 0:2]
-            data_std[c, 2:] = mouse_std
-
-            data_stderr[c, 0:2] = mouse_arr[0, 0:2]
-            data_stderr[c, 2:] = mouse_stderr
-
-        tot_data_avgs = np.vstack(
-            [tot_data_avgs, data_avgs])          # not ordered
-        tot_data_std = np.vstack([tot_data_std, data_std])
-        tot_data_stderr = np.vstack([tot_data_stderr, data_stderr])
+    data = data[(data[:, 0] >= 0) & (data[:, 0] < num_strains)]
+    mice, mouse_avg, mouse_std, mouse_stderr, _ = group_aggregate(
+        data[:, 3:], data[:, 0:2])
 
+    tot_data_avgs = np.hstack([mice, mouse_avg])
     if stdev:
-        return tot_data_avgs[1:], tot_data_std[1:]
+        return tot_data_avgs, np.hstack([mice, mouse_std])
     elif stderr:
-        return tot_data_avgs[1:], tot_data_stderr[1:]
+        return tot_data_avgs, np.hstack([mice, mouse_stderr])
 
-    return tot_data_avgs[1:]
+    return tot_data_avgs
 
 
 def mouse_to_strain_average(
@@ -77,16 +134,16 @@ def mouse_to_strain_average(
     over mice
     """
     data = np.hstack([labels, features])
-    tot_data_avgs = np.zeros((num_strains, data.shape[1] - 2))
-    tot_data_std = np.zeros((num_strains, data.shape[1] - 2))
-    tot_data_stderr = np.zeros((num_strains, data.shape[1] - 2))
+    data = data[(data[:, 0] >= 0) & (data[:, 0] < num_strains)]
+    tot_data_avgs = np.zeros((num_strains, data.shape[1] - 2)) * np.nan
+    tot_data_std = tot_data_avgs.copy()
+    tot_data_stderr = tot_data_avgs.copy()
 
-    for strain in range(0, num_strains):
-        tmp_data = data[data[:, 0] == strain, 2:]
-        tot_data_avgs[strain] = tmp_data.mean(axis=0)
-        tot_data_std[strain] = tmp_data.std(axis=0)
-        tot_data_stderr[strain] = tmp_data.std(
-            axis=0) / np.sqrt(tmp_data.shape[0] - 1)  # standard error for plot
+    strains, avgs, std, sem, _ = group_aggregate(data[:, 2:], data[:, 0])
+    strains = strains.astype(int)
+    tot_data_avgs[strains] = avgs
+    tot_data_std[strains] = std
+    tot_data_stderr[strains] = sem  # standard error for plot
 
     if stdev:
         return tot_data_avgs, tot_data_std
@@ -96,7 +153,7 @@ def mouse_to_strain_average(
     return tot_data_avgs
 
 
-def split_data_in_half_randomly(features, labels):
+def split_data_in_half_randomly(features, labels, seed=None):
     """ given an array of the form:
             features = M x A x B x C x ...
         where M is the number of mouse days
@@ -106,37 +163,20 @@ def split_data_in_half_randomly(features, labels):
         where labels[:, 0] are strain numbers and the labels[:, 1] are
         mice numbers
 
+        and an optional seed (None uses the global numpy random state)
+
         returns
             bootstrap_data_1 = a random half of the mouse days
             bootstrap_labels_1
             bootstrap_data_2 = the other half
             bootstrap_labels_2
-    """
-    all_perm_data = np.zeros(features.shape)
-    all_perm_labels = np.zeros(labels.shape)
-    strains = list(set(labels[:, 0]))
-    c = 0
 
-    for strain in strains:
-        sub_data = features[labels[:, 0] == strain]
-        sub_labels = labels[labels[:, 0] == strain]
-        mice_nums = {}
-
-        for i in range(len(sub_data)):
-            mice_nums[sub_labels[i, 1]] = 1
-
-        for mouse in mice_nums.keys():
-            # print strain, mouse
-            tmp = sub_data[sub_labels[:, 1] == mouse]
-            tmp_l = sub_labels[sub_labels[:, 1] == mouse]
-            # print tmp, tmp_l
-            perm = np.random.permutation(len(tmp))
-            all_perm_data[c:c + len(tmp)] = tmp[perm]
-            all_perm_labels[c:c + len(tmp_l)] = tmp_l[perm]
-            c += len(tmp)
+        see resampling.stratified_half_splits to draw many splits at once
+    """
+    from mousestyles.data.resampling import stratified_half_splits
 
-    return all_perm_data[::2], all_perm_labels[
-        ::2], all_perm_data[1::2], all_perm_labels[1::2]
+    idx_1, idx_2 = next(stratified_half_splits(labels, 1, seed=seed))
+    return features[idx_1], labels[idx_1], features[idx_2], labels[idx_2]
 
 
 def pull_locom_tseries_subset(M, start_time=0, stop_time=300):
@@ -178,6 +218,110 @@ def pull_locom_tseries_subset(M, start_time=0, stop_time=300):
     return new_M
 
 
+def pull_locom_tseries_windows(M, windows):
+    """
+    given an (m x n) numpy array M where the 0th row is array of times
+    [ASSUMED SORTED] and a (k x 2) array of (start_time, stop_time) windows
+
+    returns (new_M, offsets) where new_M is one (m x N) array holding the
+    k subsets of M that pull_locom_tseries_subset would return, laid end to
+    end, and offsets is a length k + 1 array such that window i is
+    new_M[:, offsets[i]:offsets[i + 1]]
+
+    all windows are gathered with a single fancy index into M, so slicing a
+    mouseday into many time bins costs one allocation instead of one copy
+    (plus boundary hstacks) per bin.  as in pull_locom_tseries_subset,
+    windows reaching past the last registered time are not padded.
+    """
+    windows = np.atleast_2d(np.asarray(windows, dtype=float))
+    if windows.shape[1] != 2:
+        raise ValueError("windows must be a (k x 2) array")
+    T = M[0]
+    n = T.shape[0]
+    start_time, stop_time = windows[:, 0], windows[:, 1]
+    idx_start = T.searchsorted(start_time)
+    idx_stop = T.searchsorted(stop_time)
+    inside = idx_stop != n
+    # value of T at idx_stop, only meaningful where inside
+    T_stop = T[np.minimum(idx_stop, n - 1)] if n else np.zeros(len(idx_stop))
+    pre = inside & (idx_start != 0)
+    pre[pre] = T[idx_start[pre]] != start_time[pre]
+    post_exact = inside & (T_stop == stop_time)
+    post = post_exact | (inside & (idx_stop != 0))
+    core = np.maximum(idx_stop - idx_start, 0)
+    lengths = pre + core + post
+    offsets = np.zeros(len(windows) + 1, dtype=int)
+    np.cumsum(lengths, out=offsets[1:])
+
+    # consecutive source columns, starting one early when padded in front
+    first = idx_start - pre
+    src = np.arange(offsets[-1]) + np.repeat(first - offsets[:-1], lengths)
+    # padding at the back repeats the last registered position
+    pad_stop = offsets[1:][post] - 1
+    src[pad_stop] = np.where(post_exact[post], idx_stop[post],
+                             idx_stop[post] - 1)
+    new_M = M[:, src].astype(float)
+    new_M[0, offsets[:-1][pre]] = start_time[pre]
+    new_M[0, pad_stop] = stop_time[post]
+    return new_M, offsets
+
+
+def total_time_rectangle_bins_windows(
+        M, offsets, xlims=(0, 1), ylims=(0, 1), xbins=5, ybins=10):
+    """
+    given the (3 x N) array M and length k + 1 offsets returned by
+    pull_locom_tseries_windows
+
+    returns a (k x ybins x xbins) array whose ith entry equals
+    total_time_rectangle_bins of window i, computed for all windows with a
+    single bincount
+    """
+    num_windows = len(offsets) - 1
+    Cnts = np.zeros(num_windows * ybins * xbins)
+    if M.shape[1] <= 1:
+        return Cnts.reshape((num_windows, ybins, xbins))
+    xmin, xmax = xlims
+    ymin, ymax = ylims
+    meshx = xmin + (xmax - xmin) * 1. * np.arange(1, xbins + 1) / xbins
+    meshy = ymin + (ymax - ymin) * 1. * np.arange(1, ybins + 1) / ybins
+    bin_idx = np.minimum(meshx.searchsorted(M[1, :-1], side='right'),
+                         xbins - 1)
+    bin_idy = np.minimum(meshy.searchsorted(M[2, :-1], side='right'),
+                         ybins - 1)
+    window = np.repeat(np.arange(num_windows), np.diff(offsets))[:-1]
+    # the step out of the last point of a window belongs to no window
+    dt = np.diff(M[0])
+    dt[_window_boundary_steps(offsets)] = 0
+    cell = (window * ybins + ybins - bin_idy - 1) * xbins + bin_idx
+    Cnts += np.bincount(cell, weights=dt, minlength=len(Cnts))
+    return Cnts.reshape((num_windows, ybins, xbins))
+
+
+def total_distance_windows(M, offsets):
+    """
+    given the (3 x N) array M and length k + 1 offsets returned by
+    pull_locom_tseries_windows
+
+    returns a length k array with the distance travelled within each window
+    """
+    dist = np.sqrt(np.diff(M[1]) ** 2 + np.diff(M[2]) ** 2)
+    dist[_window_boundary_steps(offsets)] = 0
+    # cum[i] is the distance travelled before reaching column i
+    cum = np.zeros(M.shape[1] + 1)
+    np.cumsum(dist, out=cum[1:M.shape[1]])
+    last = np.maximum(offsets[1:] - 1, offsets[:-1])
+    return cum[last] - cum[offsets[:-1]]
+
+
+def _window_boundary_steps(offsets):
+    """
+    returns the indices of the steps joining the last column of a window to
+    the first column of the next one in a pull_locom_tseries_windows result
+    """
+    bounds = offsets[1:-1]
+    return bounds[(bounds > 0) & (bounds < offsets[-1])] - 1
+
+
 def total_time_rectangle_bins(
         M, xlims=(0, 1), ylims=(0, 1), xbins=5, ybins=10):
     """
@@ -216,24 +360,12 @@ def idx_restrict_to_rectangles(TXY, rects=[(0, 0)], xlims=(
     returns new interval array which is E minus those things occuring
     outside of given rectangle
     """
-    num_movements = TXY.shape[1]
-    idx_F_bout = np.zeros(num_movements, dtype=bool)  # when at rectangles
-    tmp_sum = 0
-
+    idx_F_bout = np.zeros(TXY.shape[1], dtype=bool)  # when at rectangles
     for rect in rects:
         tl, tr, bl, br = map_xbins_ybins_to_cage(
             rectangle=rect, xbins=xbins, ybins=ybins)
-
-        for t in range(num_movements):
-            if ((TXY[1, t] > tl[0]) and (TXY[1, t] < tr[0]) and (
-                    TXY[2, t] < tl[1]) and (TXY[2, t] > bl[1])):
-                idx_F_bout[t] = True
-            # print ("indexed %d move events " % (sum(idx_F_bout) - tmp_sum))
-        tmp_sum += sum(idx_F_bout)
-
-    # print ("Total move events: %d" % num_movements)
-    # print ("indexing %d/%d (%1.1f percent) movements at rectangles" %
-    # (sum(idx_F_bout), num_movements, 100. * sum(idx_F_bout) / num_movements))
+        idx_F_bout |= ((TXY[1] > tl[0]) & (TXY[1] < tr[0]) &
+                       (TXY[2] < tl[1]) & (TXY[2] > bl[1]))
 
     return idx_F_bout
 
@@ -1,12 +1,19 @@
 from __future__ import print_function, absolute_import, division
 
+import multiprocessing
+import numbers
+import os
+from collections import namedtuple
+
 import pandas as pd
 import numpy as np
-from math import ceil
 from mousestyles import data
+from mousestyles.data.resampling import check_random_state
+from mousestyles.data.utils import _group_starts, run_offsets
 
 
-def create_time_matrix(combined_gap=4, time_gap=1, days_index=137):
+def create_time_matrix(combined_gap=4, time_gap=1, days_index=137,
+                       n_jobs=1):
     r"""
     Return a time matrix for estimate the MLE parobability.
     The rows are 137 mousedays. The columns are time series
@@ -24,6 +31,9 @@ def create_time_matrix(combined_gap=4, time_gap=1, days_index=137):
         The time gap for create the columns time series
     days_index: nonnegative int
         The number of days to process, from day 0 to day days_index.
+        The rows of later days are left as 0.
+    n_jobs: positive int
+        The number of worker processes labelling the mousedays.
 
     Returns
     -------
@@ -46,23 +56,165 @@ def create_time_matrix(combined_gap=4, time_gap=1, days_index=137):
         48013     0
         Name: 0, dtype: float64
     """
-    # check all the inputs
+    _check_time_matrix_input(combined_gap, time_gap, n_jobs)
+    condition_days_index = (type(days_index) == int and days_index >= 0)
+    if not condition_days_index:
+        raise ValueError("days_index should be nonnegative int")
+
+    state_matrix = _compute_state_matrix(combined_gap, time_gap, n_jobs,
+                                         n_days=days_index + 1)
+    return state_matrix.to_data_frame()
+
+
+class StateMatrix(namedtuple('StateMatrix',
+                             ['states', 'labels', 'start', 'stop',
+                              'time_gap'])):
+    r"""
+    Compact form of the matrix returned by create_time_matrix.
+
+    states is a (mousedays x times) uint8 array of states (0 IS,
+    1 F, 2 W, 3 others in AS), labels the (mousedays x 3) array of
+    strain, mouse and day of each row, and the times of the columns
+    are np.arange(start, stop, time_gap), available as `columns`.
+    """
+    __slots__ = ()
+
+    @property
+    def columns(self):
+        return np.arange(self.start, self.stop, self.time_gap)
+
+    def to_data_frame(self):
+        r"""
+        Return the float64 data frame laid out as create_time_matrix.
+        """
+        matrix = pd.DataFrame(np.asarray(self.states, dtype=float),
+                              columns=self.columns)
+        title = pd.DataFrame(np.asarray(self.labels),
+                             columns=['strain', 'mouse', 'day'])
+        return pd.concat([title, matrix], axis=1)
+
+
+def create_state_matrix(combined_gap=4, time_gap=1, n_jobs=1,
+                        cache_dir=None):
+    r"""
+    Return the states of all mousedays over time, as in
+    create_time_matrix, in a compact StateMatrix: uint8 states,
+    separate labels, and the column times described by their start,
+    stop and step instead of ~80,000 labels.
+
+    When cache_dir is given, the result is cached there for each
+    (combined_gap, time_gap) and later calls memory-map the cached
+    states, so they return almost instantly.
+
+    Parameters
+    ----------
+    combined_gap: nonnegative float or int
+        The threshold for combining small intervals. If next start time
+        minus last stop time is smaller than combined_gap than combined
+        these two intervals.
+    time_gap: positive float or int
+        The time gap for create the columns time series
+    n_jobs: positive int
+        The number of worker processes labelling the mousedays.
+    cache_dir: str, optional
+        The directory of the cache files; nothing is written to disk
+        if not given.
+
+    Returns
+    -------
+    state_matrix: StateMatrix
+        the states, labels and time axis of all mousedays.
+
+    Examples
+    --------
+    >>> state_matrix = create_state_matrix(combined_gap=4, time_gap=1)
+    >>> state_matrix.states.shape
+    (137, 88284)
+    >>> state_matrix.states.dtype
+    dtype('uint8')
+    >>> state_matrix.columns[:3]
+    array([48007, 48008, 48009])
+    """
+    _check_time_matrix_input(combined_gap, time_gap, n_jobs)
+    if cache_dir is None:
+        return _compute_state_matrix(combined_gap, time_gap, n_jobs)
+
+    name = os.path.join(cache_dir, "state_matrix_gap{!r}_step{!r}".format(
+        combined_gap, time_gap))
+    if os.path.exists(name + "_states.npy"):
+        axis = np.load(name + "_axis.npy")
+        # plain ints, as returned by _compute_state_matrix
+        return StateMatrix(np.load(name + "_states.npy", mmap_mode='r'),
+                           np.load(name + "_labels.npy"), int(axis[0]),
+                           int(axis[1]), time_gap)
+
+    state_matrix = _compute_state_matrix(combined_gap, time_gap, n_jobs)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    np.save(name + "_labels.npy", state_matrix.labels)
+    np.save(name + "_axis.npy", [state_matrix.start, state_matrix.stop])
+    # write the states last, under a temporary name, so that an
+    # interrupted call never leaves a partial cache behind
+    np.save(name + "_states.tmp.npy", state_matrix.states)
+    os.rename(name + "_states.tmp.npy", name + "_states.npy")
+    return state_matrix
+
+
+def _check_time_matrix_input(combined_gap, time_gap, n_jobs):
     condition_combined_gap = ((type(combined_gap) == int or
                               type(combined_gap) == float) and
                               combined_gap >= 0)
     condition_time_gap = ((type(time_gap) == int or type(time_gap) ==
                            float) and time_gap > 0)
-    condition_days_index = (type(days_index) == int and days_index >= 0)
+    condition_n_jobs = (type(n_jobs) == int and n_jobs > 0)
     if not condition_time_gap:
         raise ValueError("time_gap should be nonnegative int or float")
     if not condition_combined_gap:
         raise ValueError("combined_gap should be nonnegative int or float")
-    if not condition_days_index:
-        raise ValueError("days_index should be nonnegative int")
+    if not condition_n_jobs:
+        raise ValueError("n_jobs should be positive int")
+
 
+def _compute_state_matrix(combined_gap, time_gap, n_jobs, n_days=None):
+    r"""
+    Label the first n_days mousedays (all of them by default) and
+    return the StateMatrix; rows of later days are left as 0.
+    """
+    days, AS, F, W, initial, end = _load_state_intervals()
+    columns = np.arange(initial, end + 1, time_gap)
+    # result matrix
+    matrix = np.zeros((days.shape[0], len(columns)), dtype=np.uint8)
+    # we set 0 as IS, 1 as F, 2 as W, 3 as Others
+    if n_days is None:
+        n_days = days.shape[0]
+    n_days = min(n_days, days.shape[0])
+    tasks = []
+    for i in range(n_days):
+        key = tuple(days[i])
+        tasks.append((columns, combined_gap, AS.get(key), F.get(key),
+                      W.get(key)))
+    if n_jobs == 1:
+        rows = [_label_mouseday(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(n_jobs)
+        try:
+            rows = pool.map(_label_mouseday, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    if n_days:
+        matrix[:n_days] = rows
+    return StateMatrix(matrix, days.astype(int), initial, end + 1, time_gap)
+
+
+def _load_state_intervals():
+    r"""
+    Return (days, AS, F, W, initial, end): the (mousedays x 3) labels,
+    the AS, F and W intervals of each mouseday as returned by
+    _intervals_by_mouseday, and the first and last whole seconds of
+    the time range shared by all mousedays.
+    """
     intervals_AS = data.load_intervals('AS')
-    intervals_F = data.load_intervals('F')
-    intervals_W = data.load_intervals('W')
     intervals_IS = data.load_intervals('IS')
     # 137 days totally
     days = np.array(intervals_AS.iloc[:, 0:3].drop_duplicates().
@@ -70,58 +222,74 @@ def create_time_matrix(combined_gap=4, time_gap=1, days_index=137):
     # set time range for columns
     initial = int(min(intervals_IS['stop']))
     end = int(max(intervals_IS['stop'])) + 1
-    columns = np.arange(initial, end + 1, time_gap)
-    # result matrix
-    matrix = np.zeros((days.shape[0], len(columns)))
-    # we set 0 as IS, 1 as F, 2 as W, 3 as Others
-    for i in range(days.shape[0]):
-        W = np.array(intervals_W[(intervals_W['strain'] == days[i, 0]) &
-                                 (intervals_W['mouse'] == days[i, 1]) &
-                                 (intervals_W['day'] == days[i, 2])].
-                     iloc[:, 3:5])
-        F = np.array(intervals_F[(intervals_F['strain'] == days[i, 0]) &
-                                 (intervals_F['mouse'] == days[i, 1]) &
-                                 (intervals_F['day'] == days[i, 2])].
-                     iloc[:, 3:5])
-        AS = np.array(intervals_AS[(intervals_AS['strain'] == days[i, 0]) &
-                                   (intervals_AS['mouse'] == days[i, 1]) &
-                                   (intervals_AS['day'] == days[i, 2])].
-                      iloc[:, 3:5])
-        n = W.shape[0]
-        index = (np.array(np.where(W[1:, 0]-W[0:n - 1, 1] >
-                                   combined_gap))).ravel()
-        stop_W = W[np.append(index, n - 1), 1]
-        start_W = W[np.append(0, index + 1), 0]
-        n = F.shape[0]
-        index = (np.array(np.where(F[1:, 0]-F[0:n-1, 1] >
-                                   combined_gap))).ravel()
-        stop_F = F[np.append(index, n - 1), 1]
-        start_F = F[np.append(0, index + 1), 0]
-        n = AS.shape[0]
-        index = (np.array(np.where(AS[1:, 0]-AS[0:n - 1, 1] >
-                                   combined_gap))).ravel()
-        stop_AS = AS[np.append(index, n - 1), 1]
-        start_AS = AS[np.append(0, index + 1), 0]
-        for j in range(len(columns)):
-            if sum(np.logical_and(columns[j] > start_AS, columns[j] <
-                                  stop_AS)) != 0:
-                if sum(np.logical_and(columns[j] > start_F, columns[j] <
-                                      stop_F)) != 0:
-                    matrix[i, j] = 1  # food
-                elif sum(np.logical_and(columns[j] > start_W, columns[j] <
-                                        stop_W)) != 0:
-                    matrix[i, j] = 2  # water
-                else:
-                    matrix[i, j] = 3  # others
-        # give you the precent of matrix has been processed
-        print(i / days.shape[0], 'has been processed')
-        if i > days_index:
-            break
-    # format data frame
-    matrix = pd.DataFrame(matrix, columns=columns)
-    title = pd.DataFrame(days, columns=['strain', 'mouse', 'day'])
-    time_matrix = pd.concat([title, matrix], axis=1)
-    return(time_matrix)
+    AS = _intervals_by_mouseday(intervals_AS)
+    F = _intervals_by_mouseday(data.load_intervals('F'))
+    W = _intervals_by_mouseday(data.load_intervals('W'))
+    return days, AS, F, W, initial, end
+
+
+def _intervals_by_mouseday(intervals):
+    r"""
+    Split a data frame returned by data.load_intervals into a
+    dictionary mapping (strain, mouse, day) to the (n x 2) numpy
+    array of start and stop times of that mouseday, sorted by start.
+    """
+    values = np.array(intervals[['strain', 'mouse', 'day', 'start', 'stop']])
+    order = np.lexsort((values[:, 3], values[:, 2], values[:, 1],
+                        values[:, 0]))
+    values = values[order]
+    change = np.any(values[1:, 0:3] != values[:-1, 0:3], axis=1)
+    starts = np.flatnonzero(np.append(True, change))
+    return dict((tuple(values[a, 0:3].astype(int)), values[a:b, 3:5])
+                for a, b in zip(starts, np.append(starts[1:], len(values))))
+
+
+def _combine_intervals(intervals, combined_gap):
+    r"""
+    Merge the sorted (n x 2) intervals separated by at most
+    combined_gap and return the start and stop arrays of the result.
+    """
+    if intervals is None or len(intervals) == 0:
+        return np.zeros(0), np.zeros(0)
+    n = intervals.shape[0]
+    index = np.flatnonzero(intervals[1:, 0] - intervals[:-1, 1] >
+                           combined_gap)
+    stop = intervals[np.append(index, n - 1), 1]
+    start = intervals[np.append(0, index + 1), 0]
+    return start, stop
+
+
+def _in_intervals(times, start, stop):
+    r"""
+    Return a boolean array telling which of the times lie strictly
+    inside any of the intervals, given their start times in
+    increasing order, using one binary search per time.
+    """
+    if len(start) == 0:
+        return np.zeros(len(times), dtype=bool)
+    # the last interval starting before each time, and the furthest
+    # stop among the intervals starting before it
+    k = np.searchsorted(start, times, side='left') - 1
+    reach = np.maximum.accumulate(stop)
+    return (k >= 0) & (times < reach[np.maximum(k, 0)])
+
+
+def _label_mouseday(task):
+    r"""
+    Return the uint8 states (0 IS, 1 F, 2 W, 3 others in AS) of
+    one mouseday at the given times. `task` is the tuple
+    (times, combined_gap, AS, F, W) of the times, the gap used
+    to merge intervals and the interval arrays of the mouseday.
+    """
+    times, combined_gap, AS, F, W = task
+    in_AS = _in_intervals(times, *_combine_intervals(AS, combined_gap))
+    in_F = _in_intervals(times, *_combine_intervals(F, combined_gap))
+    in_W = _in_intervals(times, *_combine_intervals(W, combined_gap))
+    states = np.zeros(len(times), dtype=np.uint8)
+    states[in_AS] = 3
+    states[in_AS & in_W] = 2
+    states[in_AS & in_F] = 1
+    return states
 
 
 def get_prob_matrix_list(time_df, interval_length=1000):
@@ -193,18 +361,507 @@ def get_prob_matrix_list(time_df, interval_length=1000):
     if not condition_interval_length:
         raise ValueError("interval_length should be positive int")
 
-    time_array = np.array(time_df)[:, 3:]
-    n = ceil(time_array.shape[1]/interval_length)
-    matrix_list = [None] * int(n)
-    for i in np.arange(n):
-        i = int(i)
-        ind = [(i * interval_length), ((i+1) * interval_length)]
-        small_time_array = time_array[:, ind[0]:ind[1]]
-        small_time_list = list(small_time_array)
-        small_time_str_list = ["".join(np.char.mod('%i', a))
-                               for a in small_time_list]
-        matrix_list[i] = get_prob_matrix_small_interval(small_time_str_list)
-    return matrix_list
+    time_array = np.array(time_df)[:, 3:].astype(np.uint8)
+    counts = get_transition_counts(time_array, interval_length)
+    return list(get_transition_probabilities(counts))
+
+
+def get_transition_counts(states, interval_length, by_row=False,
+                          across_blocks=False):
+    r"""
+    Count the transitions between the states of every row of a state
+    matrix, separately for each block of interval_length columns.
+    Only transitions between two columns of the same block are counted,
+    as in get_prob_matrix_list, unless across_blocks is True.
+
+    Parameters
+    ----------
+    states: numpy.ndarray
+        a (mousedays x times) array of states 0 to 3, e.g. the states
+        of create_state_matrix.
+    interval_length: int
+        an integer specifying the desired length of each
+        small time interval.
+    by_row: bool
+        whether to count the transitions of each row separately.
+    across_blocks: bool
+        whether to also count the transition from the last column of a
+        block to the first column of the next one, in the block of its
+        first column.
+
+    Returns
+    -------
+    counts: numpy.ndarray
+        an integer array of shape (n_intervals, 4, 4), where
+        counts[k, i, j] is the number of transitions from state i to
+        state j in interval k, or of shape (mousedays, n_intervals,
+        4, 4) if by_row is True.
+
+    Examples
+    --------
+    >>> states = np.array([[0, 0, 0, 1, 1, 2]])
+    >>> get_transition_counts(states, 3)[:, 0, :]
+    array([[2, 0, 0, 0],
+           [0, 0, 0, 0]])
+    """
+    condition_interval_length = (type(interval_length) == int and
+                                 interval_length > 0)
+    if not condition_interval_length:
+        raise ValueError("interval_length should be positive int")
+    states = np.atleast_2d(states)
+    n_rows, n_times = states.shape
+    n_intervals = -(-n_times // interval_length)
+    n_codes = 16 * n_intervals
+    # transition t goes from column t to t + 1 and belongs to block
+    # t // interval_length unless it crosses into the next block
+    pair_block = np.arange(n_times - 1) // interval_length
+    if across_blocks:
+        keep = np.ones(n_times - 1, dtype=bool)
+    else:
+        keep = (np.arange(1, n_times) % interval_length) != 0
+    offset = (16 * pair_block[keep]).astype(np.intp)
+    if by_row:
+        counts = np.zeros((n_rows, n_codes), dtype=np.intp)
+    else:
+        counts = np.zeros(n_codes, dtype=np.intp)
+    # a few rows at a time keeps the temporary arrays small
+    for first in range(0, n_rows, 16):
+        block = states[first:first + 16].astype(np.intp)
+        codes = 4 * block[:, :-1] + block[:, 1:]
+        codes = codes[:, keep] + offset
+        if by_row:
+            size = block.shape[0]
+            codes += n_codes * np.arange(size)[:, np.newaxis]
+            counts[first:first + size] = np.bincount(
+                codes.ravel(), minlength=size * n_codes).reshape(
+                    (size, n_codes))
+        else:
+            counts += np.bincount(codes.ravel(), minlength=n_codes)
+    return counts.reshape(counts.shape[:-1] + (n_intervals, 4, 4))
+
+
+def get_transition_probabilities(counts):
+    r"""
+    Normalize transition counts into transition probabilities: every
+    row of every (4 x 4) matrix of counts is divided by its sum, and
+    rows without any transition are left as zeros.
+
+    Parameters
+    ----------
+    counts: numpy.ndarray
+        an array of shape (..., 4, 4) of transition counts, e.g. the
+        output of get_transition_counts.
+
+    Returns
+    -------
+    probs: numpy.ndarray
+        a float array of the same shape with rows summing to 1 or 0.
+
+    Examples
+    --------
+    >>> get_transition_probabilities(np.array([[2, 2, 1, 0],
+    ...                                        [0, 0, 1, 0],
+    ...                                        [0, 0, 0, 0],
+    ...                                        [0, 0, 0, 0]]))
+    array([[ 0.4,  0.4,  0.2,  0. ],
+           [ 0. ,  0. ,  1. ,  0. ],
+           [ 0. ,  0. ,  0. ,  0. ],
+           [ 0. ,  0. ,  0. ,  0. ]])
+    """
+    counts = np.asarray(counts, dtype=float)
+    totals = counts.sum(axis=-1)[..., np.newaxis]
+    return counts / np.where(totals == 0, 1, totals)
+
+
+def get_log_likelihood(states, mat_list, interval_length):
+    r"""
+    Return the log-likelihood of every row of a state matrix under
+    the time-varying Markov chain given by mat_list, as fitted by
+    get_prob_matrix_list with the same interval_length.
+
+    The transitions of all rows are counted in one pass and combined
+    with the log-probabilities, so no simulation is needed to compare
+    models fitted with different interval lengths or on different
+    strains. Every transition of a row is scored, including those
+    crossing into the next interval, with the matrix of the interval of
+    its first time step; the log-likelihoods of models with different
+    interval lengths are thus sums over the same transitions. A
+    transition of probability zero gives -inf.
+
+    Parameters
+    ----------
+    states: numpy.ndarray
+        a (mousedays x times) array of states 0 to 3, e.g. the states
+        of create_state_matrix.
+    mat_list: list or numpy.ndarray
+        the transition matrices of each small time interval, of shape
+        (n_intervals, 4, 4), or of shape (n_models, n_intervals, 4, 4)
+        to score several models at once.
+    interval_length: int
+        an integer specifying the length of each small time interval.
+
+    Returns
+    -------
+    loglik: numpy.ndarray
+        an array of shape (mousedays,), or (mousedays, n_models) when
+        several models are given.
+
+    Examples
+    --------
+    >>> states = np.array([[0, 0, 1, 1], [0, 1, 1, 1]])
+    >>> mat_list = [np.array([[.5, .5, 0, 0], [0, 1, 0, 0],
+    ...                       [0, 0, 1, 0], [0, 0, 0, 1]])] * 2
+    >>> get_log_likelihood(states, mat_list, 2)
+    array([-1.38629436, -0.69314718])
+    """
+    mats = np.asarray(mat_list, dtype=float)
+    single = mats.ndim == 3
+    if single:
+        mats = mats[np.newaxis]
+    if mats.ndim != 4 or mats.shape[-2:] != (4, 4):
+        raise ValueError("mat_list should hold 4 x 4 matrices")
+    counts = get_transition_counts(states, interval_length, by_row=True,
+                                   across_blocks=True)
+    if counts.shape[1] != mats.shape[1]:
+        raise ValueError("mat_list should have one matrix per interval")
+    counts = counts.reshape((counts.shape[0], -1)).astype(float)
+    mats = mats.reshape((mats.shape[0], -1))
+    impossible = mats == 0
+    log_mats = np.log(np.where(impossible, 1, mats))
+    loglik = np.dot(counts, log_mats.T)
+    loglik[np.dot(counts, impossible.T) > 0] = -np.inf
+    if single:
+        return loglik[:, 0]
+    return loglik
+
+
+def fit_dynamics_models(state_matrix=None, interval_length=1000,
+                        by='strain', n_jobs=1):
+    r"""
+    Fit the time-varying Markov chain of get_prob_matrix_list to every
+    strain (or every mouse) at once.
+
+    The rows of the state matrix are grouped by their labels and the
+    transitions of each group are counted by a pool of n_jobs worker
+    processes. The counts are returned with the models, so that models
+    can be merged by adding counts and refitted with
+    get_transition_probabilities.
+
+    Parameters
+    ----------
+    state_matrix: StateMatrix or pandas.DataFrame, optional
+        the states of the mousedays, as returned by create_state_matrix
+        or create_time_matrix; create_state_matrix() by default.
+    interval_length: int
+        an integer specifying the desired length of each
+        small time interval.
+    by: str
+        'strain' to fit one model per strain, 'mouse' to fit one model
+        per mouse.
+    n_jobs: positive int
+        The number of worker processes counting the transitions.
+
+    Returns
+    -------
+    keys: numpy.ndarray
+        the (n_models x 1) strains or (n_models x 2) strains and mice
+        of the models, sorted.
+    probs: numpy.ndarray
+        the transition matrices of shape (n_models, n_intervals, 4, 4);
+        probs[g] is the mat_list of model g.
+    counts: numpy.ndarray
+        the transition counts the models were estimated from, of the
+        same shape as probs.
+
+    Examples
+    --------
+    >>> keys, probs, counts = fit_dynamics_models(interval_length=1000)
+    >>> keys.ravel().tolist()
+    [0, 1, 2]
+    >>> probs.shape
+    (3, 89, 4, 4)
+    """
+    condition_interval_length = (type(interval_length) == int and
+                                 interval_length > 0)
+    if not condition_interval_length:
+        raise ValueError("interval_length should be positive int")
+    if by not in ('strain', 'mouse'):
+        raise ValueError("by should be 'strain' or 'mouse'")
+    if type(n_jobs) != int or n_jobs <= 0:
+        raise ValueError("n_jobs should be positive int")
+    if state_matrix is None:
+        state_matrix = create_state_matrix()
+    if isinstance(state_matrix, StateMatrix):
+        states = state_matrix.states
+        labels = np.asarray(state_matrix.labels)
+    elif isinstance(state_matrix, pd.DataFrame):
+        states = np.array(state_matrix)[:, 3:].astype(np.uint8)
+        labels = np.array(state_matrix)[:, :3].astype(int)
+    else:
+        raise ValueError("state_matrix should be StateMatrix or "
+                         "pandas DataFrame")
+
+    n_keys = 1 if by == 'strain' else 2
+    order, starts = _group_starts(labels[:, :n_keys])
+    keys = labels[order[starts], :n_keys]
+    tasks = [(np.asarray(states[rows]), interval_length)
+             for rows in np.split(order, starts[1:])]
+    if n_jobs == 1:
+        counts = [_fit_group(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(n_jobs)
+        try:
+            counts = pool.map(_fit_group, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    counts = np.array(counts)
+    return keys, get_transition_probabilities(counts), counts
+
+
+def _fit_group(task):
+    states, interval_length = task
+    return get_transition_counts(states, interval_length)
+
+
+class TransitionCountAccumulator(object):
+    r"""
+    Running per-strain (or per-mouse) transition counts of the
+    time-varying Markov chains of get_prob_matrix_list.
+
+    New mousedays are added one at a time, in time proportional to
+    their length, and can be subtracted again, e.g. to leave one day
+    out. The counts are kept as integers, so adding and subtracting are
+    exact, and can be saved to and loaded from a small .npz file.
+
+    Parameters
+    ----------
+    interval_length: int
+        an integer specifying the desired length of each
+        small time interval.
+
+    Examples
+    --------
+    >>> accumulator = TransitionCountAccumulator(interval_length=2)
+    >>> accumulator.add(0, np.array([0, 0, 1, 1]))
+    >>> accumulator.add(0, np.array([0, 1, 1, 1]))
+    >>> accumulator.probabilities(0)[0, 0].tolist()
+    [0.5, 0.5, 0.0, 0.0]
+    """
+
+    def __init__(self, interval_length=1000):
+        if type(interval_length) != int or interval_length <= 0:
+            raise ValueError("interval_length should be positive int")
+        self.interval_length = interval_length
+        self.counts = {}
+        self.n_days = {}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def keys(self):
+        """ Return the sorted keys, as tuples of ints. """
+        return sorted(self.counts)
+
+    def _key(self, key):
+        key = tuple(int(k) for k in np.atleast_1d(key))
+        if self.counts and len(key) != len(next(iter(self.counts))):
+            raise ValueError("key should have the same length as the "
+                             "other keys")
+        return key
+
+    def add(self, key, states, sign=1):
+        """
+        Add the transitions of the days in the rows of states (a state
+        matrix, or a single day) to the counts of key, e.g. a strain
+        or a (strain, mouse) pair.
+        """
+        key = self._key(key)
+        states = np.atleast_2d(states)
+        new = sign * get_transition_counts(states, self.interval_length)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = np.zeros(new.shape, dtype=np.int64)
+        # work on a copy, so a rejected subtraction changes nothing
+        counts = counts.copy()
+        if len(new) > len(counts):
+            # a longer day than seen so far adds intervals
+            counts = np.concatenate([counts, np.zeros(
+                (len(new) - len(counts), 4, 4), dtype=np.int64)])
+        counts[:len(new)] += new
+        n_days = self.n_days.get(key, 0) + sign * states.shape[0]
+        if n_days < 0 or np.any(counts < 0):
+            raise ValueError("cannot subtract days that were not added")
+        self.counts[key] = counts
+        self.n_days[key] = n_days
+
+    def subtract(self, key, states):
+        """
+        Remove the transitions of days previously added to key.
+        """
+        key = self._key(key)
+        if key not in self.counts:
+            raise ValueError("cannot subtract days that were not added")
+        self.add(key, states, sign=-1)
+
+    def probabilities(self, key=None):
+        """
+        Return the (n_intervals x 4 x 4) transition matrices of key,
+        or the sorted keys and the (n_keys x n_intervals x 4 x 4)
+        matrices of all keys if key is None.
+        """
+        if key is not None:
+            key = self._key(key)
+            if key not in self.counts:
+                raise ValueError("no days were added for this key")
+            return get_transition_probabilities(self.counts[key])
+        keys, counts = self._stacked_counts()
+        return np.array(keys), get_transition_probabilities(counts)
+
+    def _stacked_counts(self):
+        keys = self.keys()
+        n_intervals = max([len(self.counts[k]) for k in keys] + [0])
+        counts = np.zeros((len(keys), n_intervals, 4, 4), dtype=np.int64)
+        for i, k in enumerate(keys):
+            counts[i, :len(self.counts[k])] = self.counts[k]
+        return keys, counts
+
+    def save(self, path):
+        """
+        Save the counts to the .npz file path, with the number of
+        intervals of every key so that load restores them unpadded.
+        """
+        keys, counts = self._stacked_counts()
+        np.savez(path, interval_length=self.interval_length,
+                 keys=np.array(keys, dtype=int).reshape((len(keys), -1)),
+                 counts=counts,
+                 n_intervals=np.array([len(self.counts[k]) for k in keys],
+                                      dtype=int),
+                 n_days=np.array([self.n_days[k] for k in keys], dtype=int))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load counts saved by save.
+        """
+        saved = np.load(path)
+        accumulator = cls(int(saved['interval_length']))
+        for key, counts, n_intervals, n_days in zip(
+                saved['keys'], saved['counts'], saved['n_intervals'],
+                saved['n_days']):
+            key = tuple(int(k) for k in key)
+            accumulator.counts[key] = counts[:n_intervals].astype(np.int64)
+            accumulator.n_days[key] = int(n_days)
+        return accumulator
+
+    @classmethod
+    def from_state_matrix(cls, state_matrix=None, interval_length=1000,
+                          by='strain', n_jobs=1):
+        """
+        Return an accumulator holding the days of a state matrix,
+        grouped as in fit_dynamics_models.
+        """
+        if state_matrix is None:
+            state_matrix = create_state_matrix()
+        keys, _, counts = fit_dynamics_models(state_matrix, interval_length,
+                                              by=by, n_jobs=n_jobs)
+        if isinstance(state_matrix, StateMatrix):
+            labels = np.asarray(state_matrix.labels)
+        else:
+            labels = np.array(state_matrix)[:, :3].astype(int)
+        accumulator = cls(interval_length)
+        for key, count in zip(keys, counts):
+            key = tuple(int(k) for k in key)
+            same = np.all(labels[:, :len(key)] == key, axis=1)
+            accumulator.counts[key] = count.astype(np.int64)
+            accumulator.n_days[key] = int(same.sum())
+        return accumulator
+
+
+def get_transition_index(states, groups=None):
+    r"""
+    Return the cumulative count of transitions along the time axis of
+    a state matrix, overall or for each group of rows (e.g. strain),
+    so that the transition counts of any block of columns can be read
+    off in constant time with get_transition_counts_from_index.
+
+    Parameters
+    ----------
+    states: numpy.ndarray
+        a (mousedays x times) array of states 0 to 3, e.g. the states
+        of create_state_matrix.
+    groups: numpy.ndarray, optional
+        a label per row; the index is then built for each distinct
+        label separately.
+
+    Returns
+    -------
+    index: numpy.ndarray
+        an integer array of shape (times, 4, 4) where index[k, i, j]
+        is the number of transitions from state i to state j between
+        columns t and t + 1 for t < k. If groups is given, a tuple
+        (keys, index) of the sorted distinct labels and the array of
+        shape (n_groups, times, 4, 4).
+
+    Examples
+    --------
+    >>> states = np.array([[0, 0, 0, 1, 1, 2]])
+    >>> index = get_transition_index(states)
+    >>> index[-1, 0, :].tolist()
+    [2, 1, 0, 0]
+    >>> counts = [get_transition_counts_from_index(index, length)
+    ...           for length in (2, 3)]
+    """
+    states = np.atleast_2d(states)
+    if groups is None:
+        return _transition_index(states)
+    keys, inverse = np.unique(np.asarray(groups), return_inverse=True)
+    index = np.array([_transition_index(states[inverse == g])
+                      for g in range(len(keys))])
+    return keys, index
+
+
+def _transition_index(states):
+    n_times = states.shape[1]
+    counts = np.zeros((max(n_times - 1, 0)) * 16, dtype=np.intp)
+    offset = 16 * np.arange(n_times - 1, dtype=np.intp)
+    for first in range(0, states.shape[0], 16):
+        block = states[first:first + 16].astype(np.intp)
+        codes = 4 * block[:, :-1] + block[:, 1:] + offset
+        counts += np.bincount(codes.ravel(), minlength=len(counts))
+    index = np.zeros((n_times, 4, 4), dtype=np.int32)
+    np.cumsum(counts.reshape((-1, 4, 4)), axis=0, out=index[1:])
+    return index
+
+
+def get_transition_counts_from_index(index, interval_length):
+    r"""
+    Return the transition counts of each block of interval_length
+    columns from a cumulative index, equal to get_transition_counts
+    on the states the index was built from, at the cost of one
+    difference per block.
+
+    Parameters
+    ----------
+    index: numpy.ndarray
+        an array of shape (..., times, 4, 4) from get_transition_index.
+    interval_length: int
+        an integer specifying the desired length of each
+        small time interval.
+
+    Returns
+    -------
+    counts: numpy.ndarray
+        an integer array of shape (..., n_intervals, 4, 4).
+    """
+    condition_interval_length = (type(interval_length) == int and
+                                 interval_length > 0)
+    if not condition_interval_length:
+        raise ValueError("interval_length should be positive int")
+    n_times = index.shape[-3]
+    first = np.arange(0, n_times, interval_length)
+    last = np.minimum(first + interval_length, n_times) - 1
+    return index[..., last, :, :] - index[..., first, :, :]
 
 
 def get_prob_matrix_small_interval(string_list):
@@ -244,25 +901,17 @@ def get_prob_matrix_small_interval(string_list):
     # check all the inputs
     condition_string_list = (type(string_list) == list)
     condition_list_item = (type(string_list[0]) == str)
-    print(string_list[0])
     if not condition_string_list:
         raise ValueError("string_list should be a list")
     if not condition_list_item:
         raise ValueError("items in string_list should be str")
 
-    Mat_prob = np.zeros(4*4).reshape(4, 4)
-    for i in np.arange(4):
-        i = int(i)
-        for j in np.arange(4):
-            j = int(j)
-            ijth = str(i) + str(j)
-            Mat_prob[i, j] = sum([string.count(ijth) for string
-                                 in string_list])
-    for k in np.arange(4):
-        k = int(k)
-        if sum(Mat_prob[k, :]) != 0:
-            Mat_prob[k, :] = Mat_prob[k, :]/sum(Mat_prob[k, :])
-    return Mat_prob
+    counts = np.zeros((4, 4), dtype=int)
+    for string in string_list:
+        if len(string) > 1:
+            counts += get_transition_counts(
+                np.array(list(string)).astype(int), len(string))[0]
+    return get_transition_probabilities(counts)
 
 
 def mcmc_simulation(mat_list, n_per_int):
@@ -322,20 +971,98 @@ def mcmc_simulation(mat_list, n_per_int):
     if not condition_n_per_int:
         raise ValueError("n_per_int should be positive int")
 
-    n = len(mat_list)
-    simu_result = np.zeros(n * n_per_int)
-    for i in np.arange(n):
-        for j in np.arange(n_per_int):
-            index = int(i * n_per_int + j)
-            if index == 0:
-                simu_result[index] = 0
-            state_i = simu_result[int(index-1)]
-            prob_trans = mat_list[i][int(state_i), :]
-            prob_trans = np.cumsum(prob_trans)
-            rand = np.random.uniform()
-            state_j = sum(rand > prob_trans)
-            simu_result[index] = int(state_j)
-    simu_result = np.array(simu_result, dtype=int)
+    simu_result = mcmc_simulation_batch(mat_list, n_per_int, n_chains=1)
+    return np.array(simu_result[0], dtype=int)
+
+
+def mcmc_simulation_batch(mat_list, n_per_int, n_chains=1, seed=None,
+                          out=None, block_size=1024):
+    r"""
+    Simulate many independent days of the stochastic process used by
+    mcmc_simulation at once: all chains start from state 0 and advance
+    in lockstep, one vectorized step for all of them at a time.
+
+    The cumulative transition tables are computed once and random
+    numbers are drawn block_size steps at a time. With n_chains=1 and
+    the default seed the draws are the same as mcmc_simulation's.
+    A state whose row of the transition matrix is all zeros, i.e. that
+    was never left in the data, stays unchanged.
+
+    Parameters
+    ----------
+    mat_list: list or numpy.ndarray
+        the probability transition matrices for each small time
+        interval, as a list of (4 x 4) arrays or one array of shape
+        (n_intervals, 4, 4).
+    n_per_int: int
+        an integer specifying the desired output
+        length of each probability transition matrix.
+    n_chains: int
+        the number of days to simulate.
+    seed: None, int or numpy.random.RandomState
+        source of randomness, see data.resampling.check_random_state.
+    out: str, optional
+        path of a .npy file to stream the result to; the returned
+        array is then a memory map of that file.
+    block_size: int
+        the number of steps simulated per block of random numbers.
+
+    Returns
+    -------
+    simu_result: numpy.ndarray
+        a uint8 array of shape (n_chains, n_intervals * n_per_int)
+        with one simulated day per row.
+
+    Examples
+    --------
+    >>> mat0 = np.eye(4)
+    >>> mat1 = np.array([[0., 1, 0, 0], [1, 0, 0, 0],
+    ...                  [0, 0, 1, 0], [0, 0, 0, 1]])
+    >>> mcmc_simulation_batch([mat0, mat1], 3, n_chains=2, seed=0)
+    array([[0, 0, 0, 1, 0, 1],
+           [0, 0, 0, 1, 0, 1]], dtype=uint8)
+    """
+    mats = np.array(mat_list, dtype=float)
+    condition_mats = (mats.ndim == 3 and mats.shape[1:] == (4, 4))
+    condition_n_per_int = (type(n_per_int) == int and n_per_int > 0)
+    condition_n_chains = (type(n_chains) == int and n_chains > 0)
+    condition_block_size = (type(block_size) == int and block_size > 0)
+    if not condition_mats:
+        raise ValueError("mat_list should hold 4 x 4 matrices")
+    if not condition_n_per_int:
+        raise ValueError("n_per_int should be positive int")
+    if not condition_n_chains:
+        raise ValueError("n_chains should be positive int")
+    if not condition_block_size:
+        raise ValueError("block_size should be positive int")
+    rng = check_random_state(seed)
+
+    n_steps = mats.shape[0] * n_per_int
+    shape = (n_chains, n_steps)
+    if out is None:
+        simu_result = np.empty(shape, dtype=np.uint8)
+    else:
+        simu_result = np.lib.format.open_memmap(out, mode='w+',
+                                                dtype=np.uint8, shape=shape)
+    # rows never observed in the data (all zeros) keep the chain in
+    # place, and every row ends at exactly 1 despite rounding
+    empty = mats.sum(axis=2) == 0
+    mats[empty] = np.eye(4)[np.nonzero(empty)[1]]
+    cum_mats = np.cumsum(mats, axis=2)
+    cum_mats[:, :, 3] = 1
+    step_mat = np.arange(n_steps) // n_per_int
+    state = np.zeros(n_chains, dtype=np.intp)
+    for first in range(0, n_steps, block_size):
+        size = min(block_size, n_steps - first)
+        rand = rng.random_sample((size, n_chains))
+        block = np.empty((size, n_chains), dtype=np.uint8)
+        for k in range(size):
+            prob_trans = cum_mats[step_mat[first + k]][state]
+            state = (rand[k][:, np.newaxis] > prob_trans).sum(axis=1)
+            block[k] = state
+        simu_result[:, first:first + size] = block.T
+    if out is not None:
+        simu_result.flush()
     return simu_result
 
 
@@ -426,3 +1153,358 @@ def get_score(true_day, simulated_day, weight=[1, 10, 50, 1]):
             score += weight[int(status)]
     score = score/len_true
     return score
+
+
+def get_score_matrix(true_days, simulated_days, weight=[1, 10, 50, 1],
+                     chunk_size=4096):
+    r"""
+    Returns the evaluation score of get_score for every pair of a
+    true day and a simulated day at once.
+
+    For each state, the indicator matrices of the true and simulated
+    days being in that state are multiplied together, so the number of
+    matching seconds per state of all pairs is a product of two
+    matrices. The time axis is processed chunk_size columns at a time
+    to bound memory.
+
+    Parameters
+    ----------
+    true_days: numpy.ndarray
+        a (n_true x length) array of activities of true days, e.g.
+        rows of the states of create_state_matrix
+    simulated_days: numpy.ndarray
+        a (n_simulated x length') array of simulated days with
+        length' >= length, e.g. the output of mcmc_simulation_batch;
+        only the first length columns are used.
+    weight: list
+        a list with positive numbers showing the rewards
+        for making the right predictions of various status.
+    chunk_size: int
+        the number of time columns processed at a time.
+
+    Returns
+    -------
+    score: numpy.ndarray
+        a (n_true x n_simulated) array where score[i, j] equals
+        get_score(true_days[i], simulated_days[j], weight).
+
+    Examples
+    --------
+    >>> true_days = np.array([[0, 1, 1], [2, 2, 2]])
+    >>> simulated_days = np.array([[0, 1, 2], [1, 1, 1], [2, 2, 2]])
+    >>> get_score_matrix(true_days, simulated_days, weight=[3, 3, 3, 3])
+    array([[ 2.,  2.,  0.],
+           [ 1.,  0.,  3.]])
+    """
+    # check all the inputs
+    condition_true_day = (isinstance(true_days, np.ndarray) and
+                          true_days.ndim == 2)
+    condition_simulated_day = (isinstance(simulated_days, np.ndarray) and
+                               simulated_days.ndim == 2)
+    condition_weight = (isinstance(weight, list))
+    condition_chunk_size = (type(chunk_size) == int and chunk_size > 0)
+
+    if not condition_true_day:
+        raise ValueError("true_days should be 2-d numpy array!")
+    if not condition_simulated_day:
+        raise ValueError("simulated_days should be 2-d numpy array!")
+    if not condition_weight:
+        raise ValueError("weight should be list!")
+    if not condition_chunk_size:
+        raise ValueError("chunk_size should be positive int")
+    if len(weight) != 4:
+        raise ValueError("Length of weight should be 4!")
+    for w in weight:
+        if w <= 0:
+            raise ValueError("All the weights should be positive!")
+
+    len_true = true_days.shape[1]
+    if len_true > simulated_days.shape[1]:
+        raise ValueError("Length of simulated_day is smaller than true_day!")
+
+    score = np.zeros((true_days.shape[0], simulated_days.shape[0]))
+    for first in range(0, len_true, chunk_size):
+        stop = min(first + chunk_size, len_true)
+        true_chunk = true_days[:, first:stop]
+        simulated_chunk = simulated_days[:, first:stop]
+        for status in range(4):
+            matches = np.dot((true_chunk == status).astype(float),
+                             (simulated_chunk == status).astype(float).T)
+            score += weight[status] * matches
+    return score / len_true
+
+
+def get_state_bouts(combined_gap=4):
+    r"""
+    Return the states of all mousedays as bouts, i.e. runs of the
+    same state, computed directly from the intervals of
+    data.load_intervals instead of the per-second grid of
+    create_state_matrix.
+
+    The intervals are merged as in create_time_matrix and the state
+    between two consecutive interval boundaries is looked up once, so
+    the cost grows with the number of intervals, not of seconds. The
+    bouts of each mouseday cover the time range of the columns of
+    create_state_matrix, from its start to its stop.
+
+    Parameters
+    ----------
+    combined_gap: nonnegative float or int
+        The threshold for combining small intervals. If next start time
+        minus last stop time is smaller than combined_gap than combined
+        these two intervals.
+
+    Returns
+    -------
+    bouts: pandas.DataFrame
+        one row per bout, in time order within each mouseday, with
+        columns strain, mouse, day, state (0 IS, 1 F, 2 W, 3 others in
+        AS), start and duration.
+
+    Examples
+    --------
+    >>> bouts = get_state_bouts(combined_gap=4)
+    >>> list(bouts.columns)
+    ['strain', 'mouse', 'day', 'state', 'start', 'duration']
+    """
+    condition_combined_gap = ((type(combined_gap) == int or
+                              type(combined_gap) == float) and
+                              combined_gap >= 0)
+    if not condition_combined_gap:
+        raise ValueError("combined_gap should be nonnegative int or float")
+    days, AS, F, W, initial, end = _load_state_intervals()
+    pieces = []
+    for key in days:
+        key = tuple(key)
+        pieces.append(_mouseday_bouts((initial, end + 1, combined_gap,
+                                       AS.get(key), F.get(key), W.get(key))))
+    sizes = [len(piece[0]) for piece in pieces]
+    bouts = pd.DataFrame(np.repeat(days.astype(int), sizes, axis=0),
+                         columns=['strain', 'mouse', 'day'])
+    bouts['state'] = np.concatenate([piece[0] for piece in pieces])
+    bouts['start'] = np.concatenate([piece[1] for piece in pieces])
+    bouts['duration'] = np.concatenate([piece[2] for piece in pieces])
+    return bouts
+
+
+def _mouseday_bouts(task):
+    r"""
+    Return the (states, starts, durations) arrays of the bouts of one
+    mouseday between the times lo and hi. `task` is the tuple
+    (lo, hi, combined_gap, AS, F, W) as in _label_mouseday.
+    """
+    lo, hi, combined_gap, AS, F, W = task
+    edges = [np.array([lo, hi], dtype=float)]
+    for intervals in (AS, F, W):
+        edges.extend(_combine_intervals(intervals, combined_gap))
+    edges = np.unique(np.clip(np.concatenate(edges), lo, hi))
+    # the state is constant between two consecutive edges
+    middle = (edges[:-1] + edges[1:]) / 2
+    states = _label_mouseday((middle, combined_gap, AS, F, W))
+    keep = np.append(True, states[1:] != states[:-1])
+    starts = edges[:-1][keep]
+    return states[keep], starts, np.diff(np.append(starts, hi))
+
+
+class SemiMarkovModel(namedtuple('SemiMarkovModel',
+                                 ['initial', 'jump', 'dwell'])):
+    r"""
+    Semi-Markov model of the states fitted by fit_semi_markov.
+
+    initial is the distribution of the first state of a day, jump the
+    (4 x 4) matrix of probabilities of the next state when a bout ends
+    (with zero diagonal), and dwell a list holding, for each state, the
+    sorted durations of its observed bouts.
+    """
+    __slots__ = ()
+
+
+def fit_semi_markov(bouts):
+    r"""
+    Fit a semi-Markov model to the bouts of get_state_bouts, e.g. to
+    the bouts of one strain.
+
+    Unlike the Markov chains of get_prob_matrix_list, the time spent
+    in a state is not geometric: it is drawn from the durations of the
+    bouts of that state observed in the data. The last bout of every
+    mouseday is cut short by the end of the recording and is not used
+    for the dwell times.
+
+    Parameters
+    ----------
+    bouts: pandas.DataFrame
+        bouts with columns strain, mouse, day, state, start and
+        duration, in time order within each mouseday.
+
+    Returns
+    -------
+    model: SemiMarkovModel
+        the initial distribution, the jump matrix and the dwell times.
+
+    Examples
+    --------
+    >>> bouts = get_state_bouts()
+    >>> model = fit_semi_markov(bouts[bouts.strain == 0])
+    >>> model.jump.shape
+    (4, 4)
+    """
+    if type(bouts) != pd.core.frame.DataFrame:
+        raise ValueError("bouts should be pandas DataFrame")
+    if len(bouts) == 0:
+        raise ValueError("bouts should not be empty")
+    _, offsets = run_offsets(bouts[['strain', 'mouse', 'day']])
+    states = np.asarray(bouts['state'], dtype=np.intp)
+    durations = np.asarray(bouts['duration'], dtype=float)
+    last = offsets[1:] - 1
+
+    initial = np.bincount(states[offsets[:-1]], minlength=4)
+    initial = initial / initial.sum()
+    # bout i is followed by bout i + 1 unless it ends a mouseday
+    follows = np.ones(len(states) - 1, dtype=bool)
+    follows[last[:-1]] = False
+    codes = 4 * states[:-1][follows] + states[1:][follows]
+    jump = get_transition_probabilities(
+        np.bincount(codes, minlength=16).reshape((4, 4)))
+    complete = np.ones(len(states), dtype=bool)
+    complete[last] = False
+    dwell = [np.sort(durations[complete & (states == status)])
+             for status in range(4)]
+    return SemiMarkovModel(initial, jump, dwell)
+
+
+def semi_markov_simulation(model, day_length, n_days=1, seed=None):
+    r"""
+    Simulate whole days from a semi-Markov model, one bout at a time:
+    every day draws the duration of its current bout from the dwell
+    times of the state and its next state from the jump matrix, so the
+    cost grows with the number of bouts rather than of seconds. A
+    state that was never left in the data lasts until the end of the
+    day.
+
+    Parameters
+    ----------
+    model: SemiMarkovModel
+        the model returned by fit_semi_markov.
+    day_length: positive real number
+        the length of each simulated day, e.g. the stop minus the start
+        of create_state_matrix.
+    n_days: int
+        the number of days to simulate.
+    seed: None, int or numpy.random.RandomState
+        source of randomness, see data.resampling.check_random_state.
+
+    Returns
+    -------
+    bouts: pandas.DataFrame
+        one row per simulated bout, in time order within each day, with
+        columns day, state, start and duration; start is measured from
+        the beginning of the day.
+
+    Examples
+    --------
+    >>> model = SemiMarkovModel(np.array([1., 0, 0, 0]),
+    ...                         np.array([[0., 1, 0, 0], [1, 0, 0, 0],
+    ...                                   [0, 0, 0, 0], [0, 0, 0, 0]]),
+    ...                         [np.array([2.]), np.array([1.]),
+    ...                          np.zeros(0), np.zeros(0)])
+    >>> semi_markov_simulation(model, 5, seed=0)['state'].tolist()
+    [0, 1, 0]
+    """
+    # numpy scalars too, e.g. the stop minus the start of a StateMatrix
+    condition_day_length = (isinstance(day_length, numbers.Real) and
+                            day_length > 0)
+    condition_n_days = (type(n_days) == int and n_days > 0)
+    if not condition_day_length:
+        raise ValueError("day_length should be positive int or float")
+    if not condition_n_days:
+        raise ValueError("n_days should be positive int")
+    rng = check_random_state(seed)
+
+    cum_initial = np.cumsum(model.initial)
+    cum_initial[-1] = 1
+    jump = np.asarray(model.jump, dtype=float)
+    cum_jump = np.cumsum(jump, axis=1)
+    cum_jump[:, 3] = 1
+    sizes = np.array([len(dwell) for dwell in model.dwell])
+    first = np.append(0, np.cumsum(sizes)[:-1])
+    # a state never left, or never seen, lasts forever
+    forever = (sizes == 0) | (jump.sum(axis=1) == 0)
+    pool = np.append(np.concatenate(model.dwell), np.inf)
+
+    days = np.arange(n_days)
+    state = (rng.random_sample(n_days)[:, np.newaxis] >
+             cum_initial).sum(axis=1)
+    clock = np.zeros(n_days)
+    sim_days, sim_states, sim_starts = [], [], []
+    while len(days):
+        sim_days.append(days)
+        sim_states.append(state)
+        sim_starts.append(clock)
+        draw = first[state] + (rng.random_sample(len(days)) *
+                               sizes[state]).astype(np.intp)
+        clock = clock + np.where(forever[state], np.inf,
+                                 pool[np.minimum(draw, len(pool) - 1)])
+        going = clock < day_length
+        days, state, clock = days[going], state[going], clock[going]
+        state = (rng.random_sample(len(days))[:, np.newaxis] >
+                 cum_jump[state]).sum(axis=1)
+
+    sim_days = np.concatenate(sim_days)
+    order = np.argsort(sim_days, kind='mergesort')
+    sim_days = sim_days[order]
+    starts = np.concatenate(sim_starts)[order]
+    stops = np.append(starts[1:], day_length)
+    stops[np.append(sim_days[1:] != sim_days[:-1], True)] = day_length
+    bouts = pd.DataFrame({'day': sim_days,
+                          'state': np.concatenate(sim_states)[order],
+                          'start': starts, 'duration': stops - starts},
+                         columns=['day', 'state', 'start', 'duration'])
+    return bouts
+
+
+def get_bout_states(bouts, times):
+    r"""
+    Return the states of bouts at the given times, one row per day, so
+    that bouts can be compared with a state matrix, e.g. with
+    get_score_matrix.
+
+    Parameters
+    ----------
+    bouts: pandas.DataFrame
+        bouts with columns state, start and duration, in time order
+        within each day; all the other columns (e.g. strain, mouse and
+        day) identify the day.
+    times: numpy.ndarray
+        the increasing times to look up, e.g. the columns of
+        create_state_matrix.
+
+    Returns
+    -------
+    states: numpy.ndarray
+        a uint8 array of shape (days, times), in order of appearance of
+        the days in bouts. Times before the first bout of a day get
+        the state of the first bout.
+
+    Examples
+    --------
+    >>> bouts = pd.DataFrame({'day': [0, 0, 1], 'state': [0, 3, 1],
+    ...                       'start': [0., 2, 0], 'duration': [2., 2, 4]},
+    ...                      columns=['day', 'state', 'start', 'duration'])
+    >>> get_bout_states(bouts, np.arange(4))
+    array([[0, 0, 3, 3],
+           [1, 1, 1, 1]], dtype=uint8)
+    """
+    if type(bouts) != pd.core.frame.DataFrame:
+        raise ValueError("bouts should be pandas DataFrame")
+    key_columns = [column for column in bouts.columns
+                   if column not in ('state', 'start', 'duration')]
+    _, offsets = run_offsets(bouts[key_columns])
+    all_states = np.asarray(bouts['state'], dtype=np.uint8)
+    all_starts = np.asarray(bouts['start'], dtype=float)
+    times = np.asarray(times)
+    states = np.empty((len(offsets) - 1, len(times)), dtype=np.uint8)
+    for i in range(len(offsets) - 1):
+        starts = all_starts[offsets[i]:offsets[i + 1]]
+        k = np.searchsorted(starts, times, side='right') - 1
+        states[i] = all_states[offsets[i]:offsets[i + 1]][np.maximum(k, 0)]
+    return states
@@ -5,10 +5,20 @@ import pytest
 import numpy as np
 import pandas as pd
 
-from mousestyles.dynamics import create_time_matrix
+from mousestyles.dynamics import create_time_matrix, _label_mouseday
+from mousestyles.dynamics import create_state_matrix
+from mousestyles.dynamics import get_transition_counts
+from mousestyles.dynamics import get_transition_probabilities
+from mousestyles.dynamics import get_transition_index
+from mousestyles.dynamics import get_transition_counts_from_index
+from mousestyles.dynamics import get_log_likelihood, fit_dynamics_models
 from mousestyles.dynamics import get_prob_matrix_list
 from mousestyles.dynamics import get_prob_matrix_small_interval
 from mousestyles.dynamics import mcmc_simulation, get_score
+from mousestyles.dynamics import mcmc_simulation_batch, get_score_matrix
+from mousestyles.dynamics import _mouseday_bouts, get_bout_states
+from mousestyles.dynamics import fit_semi_markov, semi_markov_simulation
+from mousestyles.dynamics import SemiMarkovModel, TransitionCountAccumulator
 
 
 def test_creat_time_matrix_input():
@@ -36,12 +46,64 @@ def test_creat_time_matrix_input():
     with pytest.raises(ValueError) as excinfo:
         create_time_matrix(combined_gap=4, time_gap=1, days_index=0.1)
     assert excinfo.value.args[0] == "days_index should be nonnegative int"
+    # n_jobs is zero
+    with pytest.raises(ValueError) as excinfo:
+        create_time_matrix(combined_gap=4, time_gap=1, n_jobs=0)
+    assert excinfo.value.args[0] == "n_jobs should be positive int"
 
 
 def test_creat_time_matrix():
     # Checking functions output the correct time matrix
     matrix = create_time_matrix(combined_gap=4, time_gap=1, days_index=0)
     assert matrix.iloc[0, 2181] == 1.0
+    # only the first day is processed
+    assert np.all(matrix.iloc[1:, 3:] == 0)
+    # worker processes give the same matrix
+    matrix_pool = create_time_matrix(combined_gap=4, time_gap=1,
+                                     days_index=2, n_jobs=2)
+    assert np.all(matrix_pool.iloc[0] == matrix.iloc[0])
+    assert np.all(matrix_pool.iloc[1:3, 3:].max(axis=1) > 0)
+
+
+def test_create_state_matrix(tmpdir):
+    cache_dir = str(tmpdir)
+    state_matrix = create_state_matrix(combined_gap=4, time_gap=1,
+                                       cache_dir=cache_dir)
+    assert state_matrix.states.dtype == np.uint8
+    assert state_matrix.states.shape == (137, len(state_matrix.columns))
+    assert state_matrix.labels.shape == (137, 3)
+    assert state_matrix.states[0, 2178] == 1
+    # the second call reads the memory-mapped cache
+    cached = create_state_matrix(combined_gap=4, time_gap=1,
+                                 cache_dir=cache_dir)
+    assert isinstance(cached.states, np.memmap)
+    np.testing.assert_array_equal(cached.states, state_matrix.states)
+    np.testing.assert_array_equal(cached.labels, state_matrix.labels)
+    np.testing.assert_array_equal(cached.columns, state_matrix.columns)
+    assert type(cached.start) == type(state_matrix.start) == int
+    assert type(cached.stop) == type(state_matrix.stop) == int
+    time_df = cached.to_data_frame()
+    assert list(time_df.columns[:4]) == ['strain', 'mouse', 'day', 48007]
+    assert time_df.iloc[0, 2181] == 1.0
+    # input is checked before the cache is looked up
+    with pytest.raises(ValueError) as excinfo:
+        create_state_matrix(combined_gap=4, time_gap=0, cache_dir=cache_dir)
+    assert excinfo.value.args[0] == \
+        "time_gap should be nonnegative int or float"
+
+
+def test_label_mouseday():
+    # 0 outside AS, 1 in F, 2 in W, 3 elsewhere in AS; the two F
+    # intervals are merged since they are 2 seconds apart
+    times = np.arange(10)
+    AS = np.array([[0.5, 8.5]])
+    F = np.array([[1.5, 2.5], [4.5, 5.5]])
+    W = np.array([[6.5, 7.5]])
+    states = _label_mouseday((times, 2, AS, F, W))
+    assert states.dtype == np.uint8
+    np.testing.assert_array_equal(states, [0, 3, 1, 1, 1, 1, 3, 2, 3, 0])
+    states = _label_mouseday((times, 1, AS, F, None))
+    np.testing.assert_array_equal(states, [0, 3, 1, 3, 3, 1, 3, 3, 3, 0])
 
 
 def test_get_prob_matrix_list_input():
@@ -76,6 +138,179 @@ def test_get_prob_matrix_list():
     assert sum(sum(mat_list[0])) == 1.
 
 
+def test_get_transition_counts():
+    states = np.array([[0, 0, 0, 1, 1, 2, 3],
+                       [3, 3, 2, 2, 0, 0, 0]], dtype=np.uint8)
+    counts = get_transition_counts(states, 3)
+    assert counts.shape == (3, 4, 4)
+    # overlapping pairs are all counted, pairs across blocks are not
+    assert counts[0, 0, 0] == 2
+    assert counts[0, 3, 3] == 1
+    assert counts[0, 3, 2] == 1
+    assert counts[1, 1, 1] == 1
+    assert counts[1, 1, 2] == 1
+    assert counts[1, 2, 0] == 1
+    assert counts[2].sum() == 0
+    assert counts.sum() == 8
+    probs = get_transition_probabilities(counts)
+    np.testing.assert_allclose(probs[0, 3], [0, 0, .5, .5])
+    np.testing.assert_allclose(probs[2], np.zeros((4, 4)))
+    with pytest.raises(ValueError) as excinfo:
+        get_transition_counts(states, 0)
+    assert excinfo.value.args[0] == "interval_length should be positive int"
+
+
+def test_fit_dynamics_models():
+    rng = np.random.RandomState(0)
+    labels = np.array([[1, 0, 0], [0, 0, 0], [1, 1, 0], [0, 1, 1]])
+    states = rng.randint(4, size=(4, 30))
+    time_df = pd.DataFrame(np.hstack([labels, states]))
+    keys, probs, counts = fit_dynamics_models(time_df, 10)
+    np.testing.assert_array_equal(keys, [[0], [1]])
+    assert probs.shape == (2, 3, 4, 4)
+    np.testing.assert_array_equal(
+        counts[1], get_transition_counts(states[[0, 2]], 10))
+    np.testing.assert_allclose(
+        probs[0], get_prob_matrix_list(time_df.iloc[[1, 3]], 10))
+    keys, probs, counts = fit_dynamics_models(time_df, 10, by='mouse',
+                                              n_jobs=2)
+    np.testing.assert_array_equal(keys, [[0, 0], [0, 1], [1, 0], [1, 1]])
+    np.testing.assert_array_equal(counts[3],
+                                  get_transition_counts(states[2], 10))
+    with pytest.raises(ValueError) as excinfo:
+        fit_dynamics_models(time_df, 10, by='day')
+    assert excinfo.value.args[0] == "by should be 'strain' or 'mouse'"
+    with pytest.raises(ValueError) as excinfo:
+        fit_dynamics_models(states, 10)
+    error_message = "state_matrix should be StateMatrix or pandas DataFrame"
+    assert excinfo.value.args[0] == error_message
+
+
+def test_transition_count_accumulator(tmpdir):
+    rng = np.random.RandomState(0)
+    labels = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 1, 1]])
+    states = rng.randint(4, size=(4, 25))
+    time_df = pd.DataFrame(np.hstack([labels, states]))
+    accumulator = TransitionCountAccumulator.from_state_matrix(time_df, 10)
+    assert accumulator.keys() == [(0,), (1,)]
+    assert accumulator.n_days == {(0,): 3, (1,): 1}
+    keys, probs = accumulator.probabilities()
+    _, expected, _ = fit_dynamics_models(time_df, 10)
+    np.testing.assert_allclose(probs, expected)
+
+    # leave one day out and add it back
+    accumulator.subtract(0, states[2])
+    np.testing.assert_allclose(
+        accumulator.probabilities(0),
+        get_prob_matrix_list(time_df.iloc[[0, 3]], 10))
+    accumulator.add(0, states[2])
+    np.testing.assert_allclose(accumulator.probabilities(0), expected[0])
+    with pytest.raises(ValueError) as excinfo:
+        accumulator.subtract(1, states[0])
+    error_message = "cannot subtract days that were not added"
+    assert excinfo.value.args[0] == error_message
+    np.testing.assert_allclose(accumulator.probabilities(1), expected[1])
+    # a rejected subtraction through add leaves the counts unchanged
+    before = accumulator.counts[(1,)].copy()
+    with pytest.raises(ValueError) as excinfo:
+        accumulator.add(1, states[0], sign=-1)
+    assert excinfo.value.args[0] == error_message
+    np.testing.assert_array_equal(accumulator.counts[(1,)], before)
+    assert accumulator.n_days[(1,)] == 1
+
+    # keys with fewer intervals are saved and loaded unpadded
+    accumulator.add(2, states[0, :5])
+    assert accumulator.counts[(2,)].shape == (1, 4, 4)
+    path = str(tmpdir.join("counts.npz"))
+    accumulator.save(path)
+    loaded = TransitionCountAccumulator.load(path)
+    assert loaded.interval_length == 10
+    assert loaded.n_days == accumulator.n_days
+    assert loaded.keys() == accumulator.keys()
+    for key in accumulator.keys():
+        assert loaded.counts[key].shape == accumulator.counts[key].shape
+        np.testing.assert_array_equal(loaded.counts[key],
+                                      accumulator.counts[key])
+    with pytest.raises(ValueError) as excinfo:
+        TransitionCountAccumulator(0)
+    assert excinfo.value.args[0] == "interval_length should be positive int"
+
+
+def test_get_transition_index():
+    states = np.random.RandomState(0).randint(4, size=(5, 47))
+    index = get_transition_index(states)
+    assert index.shape == (47, 4, 4)
+    for length in [1, 2, 5, 10, 46, 47, 100]:
+        np.testing.assert_array_equal(
+            get_transition_counts_from_index(index, length),
+            get_transition_counts(states, length))
+    groups = np.array([1, 0, 1, 1, 0])
+    keys, index = get_transition_index(states, groups)
+    np.testing.assert_array_equal(keys, [0, 1])
+    assert index.shape == (2, 47, 4, 4)
+    counts = get_transition_counts_from_index(index, 10)
+    np.testing.assert_array_equal(
+        counts[1], get_transition_counts(states[groups == 1], 10))
+
+
+def test_get_log_likelihood():
+    rng = np.random.RandomState(0)
+    states = rng.randint(4, size=(3, 20)).astype(np.uint8)
+    by_row = get_transition_counts(states, 6, by_row=True)
+    assert by_row.shape == (3, 4, 4, 4)
+    np.testing.assert_array_equal(by_row.sum(axis=0),
+                                  get_transition_counts(states, 6))
+    mats = get_transition_probabilities(
+        get_transition_counts(states, 6) + 1)
+    loglik = get_log_likelihood(states, mats, 6)
+    assert loglik.shape == (3,)
+    # every transition is scored with the matrix of its first time step
+    for row in range(3):
+        expected = 0
+        for t in range(19):
+            expected += np.log(mats[t // 6, states[row, t],
+                                    states[row, t + 1]])
+        assert np.isclose(loglik[row], expected)
+    # several models at once, impossible transitions give -inf
+    uniform = np.ones((4, 4, 4)) / 4
+    identity = np.tile(np.eye(4), (4, 1, 1))
+    both = get_log_likelihood(states, [uniform, identity], 6)
+    assert both.shape == (3, 2)
+    np.testing.assert_allclose(both[:, 0], 19 * np.log(.25))
+    assert np.all(both[:, 1] == -np.inf)
+    with pytest.raises(ValueError) as excinfo:
+        get_log_likelihood(states, mats, 4)
+    error_message = "mat_list should have one matrix per interval"
+    assert excinfo.value.args[0] == error_message
+    with pytest.raises(ValueError) as excinfo:
+        get_log_likelihood(states, np.ones((4, 3, 3)), 6)
+    assert excinfo.value.args[0] == "mat_list should hold 4 x 4 matrices"
+
+
+def test_get_log_likelihood_interval_lengths():
+    # a sticky chain, simulated with the same matrix at every step
+    sticky = np.full((4, 4), .05) + .8 * np.eye(4)
+    rng = np.random.RandomState(1)
+    states = np.zeros((2, 100), dtype=np.uint8)
+    for t in range(1, 100):
+        for row in range(2):
+            states[row, t] = rng.choice(4, p=sticky[states[row, t - 1]])
+    # the same transitions are scored whatever the interval length
+    uniform = {}
+    for length in [1, 2, 5, 10, 100]:
+        n_intervals = -(-100 // length)
+        uniform[length] = get_log_likelihood(
+            states, np.ones((n_intervals, 4, 4)) / 4, length)
+        np.testing.assert_allclose(uniform[length], 99 * np.log(.25))
+        correct = get_log_likelihood(
+            states, np.tile(sticky, (n_intervals, 1, 1)), length)
+        np.testing.assert_allclose(
+            correct, get_log_likelihood(states, sticky[np.newaxis], 100))
+    # a finer but wrong model does not beat the correct one
+    assert np.all(uniform[1] < get_log_likelihood(
+        states, sticky[np.newaxis], 100))
+
+
 def test_get_prob_matrix_small_interval_input():
     # checking functions raise the correct errors for wrong input
     # string_list is not list
@@ -98,6 +333,9 @@ def test_get_prob_matrix_small_interval():
     assert example[0, 2] == 0.2
     assert example[1, 2] == 1.
     assert sum(example[0, :]) == 1.
+    # overlapping transitions are counted
+    example = get_prob_matrix_small_interval([str('0001')])
+    np.testing.assert_allclose(example[0], [2. / 3, 1. / 3, 0, 0])
 
 
 def test_mcmc_simulation_input():
@@ -146,6 +384,57 @@ def test_mcmc_simulation():
     assert example[11] == 0.
 
 
+def _per_step_simulation(mat_list, n_per_int):
+    # one uniform draw per step from the global state; the first step
+    # starts from state 0
+    simu_result = np.zeros(len(mat_list) * n_per_int, dtype=int)
+    for index in range(len(simu_result)):
+        prob_trans = np.cumsum(mat_list[index // n_per_int][
+            simu_result[index - 1], :])
+        simu_result[index] = sum(np.random.uniform() > prob_trans)
+    return simu_result
+
+
+def test_mcmc_simulation_batch(tmpdir):
+    mat0 = np.eye(4)
+    mat1 = np.array([[0., 1, 0, 0], [1, 0, 0, 0],
+                     [0, 0, 1, 0], [0, 0, 0, 1]])
+    example = mcmc_simulation_batch([mat0, mat1], 10, n_chains=3)
+    assert example.shape == (3, 20)
+    assert example.dtype == np.uint8
+    np.testing.assert_array_equal(example[:, :10], 0)
+    np.testing.assert_array_equal(example[:, 10:], [[1, 0] * 5] * 3)
+    # seeded runs are reproducible, and can be streamed to disk
+    mats = np.random.RandomState(0).rand(3, 4, 4)
+    mats /= mats.sum(axis=2)[:, :, np.newaxis]
+    first = mcmc_simulation_batch(mats, 50, n_chains=20, seed=1)
+    path = str(tmpdir.join('simulation.npy'))
+    second = mcmc_simulation_batch(mats, 50, n_chains=20, seed=1,
+                                   out=path, block_size=7)
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_array_equal(np.load(path), first)
+    # a single chain with the global seed matches the per-step sampler
+    # mcmc_simulation used before it called mcmc_simulation_batch
+    np.random.seed(2)
+    single = _per_step_simulation(list(mats), 50)
+    np.random.seed(2)
+    np.testing.assert_array_equal(mcmc_simulation_batch(mats, 50)[0],
+                                  single)
+    np.random.seed(2)
+    np.testing.assert_array_equal(mcmc_simulation(list(mats), 50), single)
+    # a state never left in the data keeps the chain in place
+    stuck = np.zeros((1, 4, 4))
+    stuck[0, 0, 2] = 1
+    np.testing.assert_array_equal(
+        mcmc_simulation_batch(stuck, 4, seed=0), [[2, 2, 2, 2]])
+    with pytest.raises(ValueError) as excinfo:
+        mcmc_simulation_batch(mats, 50, n_chains=0)
+    assert excinfo.value.args[0] == "n_chains should be positive int"
+    with pytest.raises(ValueError) as excinfo:
+        mcmc_simulation_batch(np.eye(4), 50)
+    assert excinfo.value.args[0] == "mat_list should hold 4 x 4 matrices"
+
+
 def test_get_score_input():
     # checking functions raise the correct errors for wrong input
     # true_day is not numpy.array
@@ -190,3 +479,99 @@ def test_get_score():
 
     assert score_1 == 0.0
     assert score_2 == 10.0
+
+
+def test_get_score_matrix():
+    rng = np.random.RandomState(0)
+    true_days = rng.randint(4, size=(3, 25))
+    simulated_days = rng.randint(4, size=(5, 30))
+    weight = [1, 10, 50, 1]
+    score = get_score_matrix(true_days, simulated_days, weight,
+                             chunk_size=7)
+    assert score.shape == (3, 5)
+    for i in range(3):
+        for j in range(5):
+            assert np.isclose(score[i, j], get_score(
+                true_days[i], simulated_days[j], weight))
+
+
+def test_get_score_matrix_input():
+    with pytest.raises(ValueError) as excinfo:
+        get_score_matrix(np.zeros(13), np.zeros((2, 13)))
+    assert excinfo.value.args[0] == "true_days should be 2-d numpy array!"
+    with pytest.raises(ValueError) as excinfo:
+        get_score_matrix(np.zeros((2, 13)), np.zeros((2, 5)))
+    error_message = "Length of simulated_day is smaller than true_day!"
+    assert excinfo.value.args[0] == error_message
+    with pytest.raises(ValueError) as excinfo:
+        get_score_matrix(np.zeros((2, 13)), np.zeros((2, 13)),
+                         weight=[1, 0, 1, 1])
+    assert excinfo.value.args[0] == "All the weights should be positive!"
+
+
+def test_mouseday_bouts():
+    AS = np.array([[2.5, 10.2], [20.5, 30.]])
+    F = np.array([[3.5, 4.2], [4.5, 6.]])
+    W = np.array([[8.2, 12.]])
+    states, starts, durations = _mouseday_bouts((0, 40, 0.5, AS, F, W))
+    np.testing.assert_array_equal(states, [0, 3, 1, 3, 2, 0, 3, 0])
+    np.testing.assert_allclose(starts, [0, 2.5, 3.5, 6, 8.2, 10.2,
+                                        20.5, 30])
+    assert durations.sum() == 40
+    # same states as the grid away from the bout boundaries
+    times = np.arange(0, 40) + .25
+    grid = _label_mouseday((times, 0.5, AS, F, W))
+    bouts = pd.DataFrame({'day': 0, 'state': states, 'start': starts,
+                          'duration': durations})
+    np.testing.assert_array_equal(get_bout_states(bouts, times)[0], grid)
+
+
+def test_fit_semi_markov():
+    bouts = pd.DataFrame({'strain': 0, 'mouse': 0,
+                          'day': [0, 0, 0, 1, 1],
+                          'state': [0, 3, 1, 0, 3],
+                          'start': [0., 5, 6, 0, 4],
+                          'duration': [5., 1, 3, 4, 5]})
+    model = fit_semi_markov(bouts)
+    np.testing.assert_allclose(model.initial, [1, 0, 0, 0])
+    np.testing.assert_allclose(model.jump[0], [0, 0, 0, 1])
+    np.testing.assert_allclose(model.jump[3], [0, 1, 0, 0])
+    np.testing.assert_allclose(model.jump[1], np.zeros(4))
+    # the last bout of each day is censored
+    np.testing.assert_allclose(model.dwell[0], [4, 5])
+    np.testing.assert_allclose(model.dwell[3], [1])
+    assert len(model.dwell[1]) == 0
+    with pytest.raises(ValueError) as excinfo:
+        fit_semi_markov(np.zeros(3))
+    assert excinfo.value.args[0] == "bouts should be pandas DataFrame"
+
+
+def test_semi_markov_simulation():
+    model = SemiMarkovModel(np.array([.5, 0, 0, .5]),
+                            np.array([[0., 0, 0, 1], [0, 0, 0, 0],
+                                      [0, 0, 0, 0], [1, 0, 0, 0]]),
+                            [np.array([2., 3]), np.zeros(0), np.zeros(0),
+                             np.array([1.])])
+    bouts = semi_markov_simulation(model, 20, n_days=50, seed=0)
+    assert list(bouts.columns) == ['day', 'state', 'start', 'duration']
+    np.testing.assert_allclose(bouts.groupby('day')['duration'].sum(),
+                               20 * np.ones(50))
+    states = np.asarray(bouts['state'])
+    same_day = np.diff(bouts['day']) == 0
+    assert np.all(states[1:][same_day] != states[:-1][same_day])
+    assert set(bouts['duration'][np.append(same_day, False)]) <= {1, 2, 3}
+    again = semi_markov_simulation(model, 20, n_days=50, seed=0)
+    np.testing.assert_array_equal(bouts, again)
+    # numpy scalars, e.g. from a cached StateMatrix, are accepted
+    again = semi_markov_simulation(model, np.int64(20), n_days=50, seed=0)
+    np.testing.assert_array_equal(bouts, again)
+    again = semi_markov_simulation(model, np.float32(20), n_days=50, seed=0)
+    np.testing.assert_array_equal(bouts, again)
+    with pytest.raises(ValueError) as excinfo:
+        semi_markov_simulation(model, 0)
+    error_message = "day_length should be positive int or float"
+    assert excinfo.value.args[0] == error_message
+    for day_length in [np.float64(-1), '20', 1j]:
+        with pytest.raises(ValueError) as excinfo:
+            semi_markov_simulation(model, day_length)
+        assert excinfo.value.args[0] == error_message
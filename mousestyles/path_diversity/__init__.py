@@ -26,13 +26,14 @@ def path_index(movement, stop_threshold, min_path_length):
 
     Returns
     -------
-    paths index : a list containing the indices for all paths
+    paths index : (n x 2) numpy.ndarray of int, the start and end
+        indices of all paths, one path per row
 
     Examples
     --------
     >>> movement = data.load_movement(1, 2, 1)
     >>> paths = path_index(movement, 1, 1)[:5]
-    >>> paths
+    >>> paths.tolist()
     [[0, 2], [6, 8], [107, 113], [129, 131], [144, 152]]
     """
     # check if all inputs are positive integers
@@ -44,31 +45,66 @@ def path_index(movement, stop_threshold, min_path_length):
         raise TypeError("min_path_length needs to be integer")
 
     # Pull out time variable
-    T = movement['t'].ravel()
-    # Calculate time differences
-    TD = np.diff(T)
-    path = []
-
-    # index
-    i = 0
-    while i < len(TD):
-        start_index = i
-        # If time difference is less than stop_threshold
-        # start to track the index in this path
-        while TD[i] < stop_threshold:
-            i += 1
-            if i == len(TD):
-                break
-        end_index = i
-
-        # Check whether start index is equal to end index
-        # If they are equal jump to next index
-        if start_index == end_index:
-            next
-        else:
-            path.append([start_index, end_index])
-
-        i += 1
-    path = [p for p in path if (p[1] - p[0]) > min_path_length]
-
-    return(path)
+    T = np.asarray(movement['t'])
+    # Consecutive observations less than stop_threshold apart
+    # are in the same path
+    return _runs_to_paths(np.diff(T) < stop_threshold, min_path_length)
+
+
+def path_index_all(movement, stop_threshold, min_path_length):
+    r"""
+    Return the start and end indices of the paths of all mousedays at
+    once, as path_index would find them in each mousday separately.
+    Paths never run across two mousedays.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        strain, mouse, day, CT, CX, CY coordinates and homebase status
+        of many mousedays, as returned by data.load_all_movement
+    stop_threshold : float
+        positive number indicating the path cutoff criteria
+        if the time difference between two observations is
+        less than this threhold, they will be in the same path
+    min_path_length : int
+        positive integer indicating how many observations in
+        a path
+
+    Returns
+    -------
+    paths index : (n x 2) numpy.ndarray of int, the start and end
+        row numbers in movement of all paths, one path per row;
+        the mouseday of a path is the strain, mouse and day of its
+        start row
+
+    Examples
+    --------
+    >>> movement = data.load_all_movement()
+    >>> paths = path_index_all(movement, 1, 1)
+    >>> labels = movement[['strain', 'mouse', 'day']].values[paths[:, 0]]
+    """
+    conditions_value = [stop_threshold <= 0, min_path_length <= 0]
+    conditions_type = type(min_path_length) != int
+    if any(conditions_value):
+        raise ValueError("Input values need to be positive")
+    if conditions_type:
+        raise TypeError("min_path_length needs to be integer")
+
+    keys = np.asarray(movement[['strain', 'mouse', 'day']])
+    same_day = np.all(keys[1:] == keys[:-1], axis=1)
+    T = np.asarray(movement['t'])
+    return _runs_to_paths(same_day & (np.diff(T) < stop_threshold),
+                          min_path_length)
+
+
+def _runs_to_paths(linked, min_path_length):
+    """
+    Given whether each observation is linked to the next one, return
+    the (n x 2) start and end indices of the maximal runs of linked
+    observations spanning more than min_path_length steps.
+    """
+    edges = np.diff(np.concatenate(([0], linked.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) > min_path_length
+    return np.column_stack((starts[keep], ends[keep])).astype(int)
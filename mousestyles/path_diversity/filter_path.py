@@ -1,33 +1,37 @@
 from __future__ import print_function, absolute_import, division
 
+import numpy as np
+
+from mousestyles.path_diversity.get_dist_speed import get_dist_speed_paths
+
 
 def filter_paths(movement, paths, time_threshold):
     r"""
-    Return a list object containing start and end indices for
-    movements lasting equal to or longer than the specified time
-    threshold
+    Return the start and end indices of the paths lasting equal to
+    or longer than the specified time threshold
 
     Parameters
     ----------
     movement : pandas.DataFrame
         CT, CX, CY coordinates and homebase status
         for the unique combination of strain, mouse and day
-    paths: list
-        a list containing the indices for all paths
+    paths: numpy.ndarray
+        (n x 2) start and end indices of all paths, as returned by
+        path_index
     time_threshold : float
         positive number indicating the time threshold
 
     Returns
     -------
-    paths index : a list containing the indices for all paths
+    paths index : (m x 2) numpy.ndarray of the indices of the paths
     that the spending times are larger than a time threshold
 
     Examples
     --------
     >>> movement = data.load_movement(1, 2, 1)
     >>> paths = path_index(movement, 1, 1)
-    >>> filter_paths(movement, paths, 20)
-    [[26754, 26897], [28538, 28627]
+    >>> filter_paths(movement, paths, 20).tolist()
+    [[26754, 26897], [28538, 28627]]
     """
 
     # check if all inputs are positive integers
@@ -35,17 +39,123 @@ def filter_paths(movement, paths, time_threshold):
     if conditions_value:
         raise ValueError("Input values need to be positive")
 
-    # Variable that store paths equal to or larger than time threshold
-    pass_paths = []
-
+    paths = np.asarray(paths, dtype=int).reshape((-1, 2))
     # Pull out time variable
-    T = movement['t']
+    T = np.asarray(movement['t'])
+    # Keep the paths whose time spent is equal to or larger than
+    # the time threshold
+    return paths[T[paths[:, 1]] - T[paths[:, 0]] >= time_threshold]
+
+
+def filter_mask(metrics, min_duration=None, min_points=None,
+                min_distance=None, min_speed=None, max_speed=None):
+    r"""
+    Return which paths pass all the given thresholds at once: a
+    duration, a number of observations, a distance travelled and an
+    average speed at least as large as the minimums, and an average
+    speed at most max_speed. Thresholds left to None are not applied.
+
+    Parameters
+    ----------
+    metrics : pandas.DataFrame or dict
+        the columns duration, n_points, distance and mean_speed of the
+        paths, e.g. the table of path_table.get_path_table; only the
+        columns of the given thresholds are needed
+    min_duration, min_points, min_distance, min_speed, max_speed : float
+        positive thresholds
+
+    Returns
+    -------
+    mask : numpy.ndarray of bool, True for the paths passing
+
+    Examples
+    --------
+    >>> metrics = {'duration': np.array([1., 30]),
+    ...            'distance': np.array([20., 5])}
+    >>> filter_mask(metrics, min_duration=20, min_distance=2).tolist()
+    [False, True]
+    """
+    thresholds = [('duration', min_duration, np.greater_equal),
+                  ('n_points', min_points, np.greater_equal),
+                  ('distance', min_distance, np.greater_equal),
+                  ('mean_speed', min_speed, np.greater_equal),
+                  ('mean_speed', max_speed, np.less_equal)]
+    if any(value is not None and value <= 0 for _, value, _ in thresholds):
+        raise ValueError("Input values need to be positive")
+
+    mask = None
+    for column, value, compare in thresholds:
+        if value is None:
+            continue
+        passing = compare(np.asarray(metrics[column]), value)
+        mask = passing if mask is None else mask & passing
+    if mask is None:
+        for column, _, _ in thresholds:
+            if column in metrics:
+                return np.ones(len(metrics[column]), dtype=bool)
+        raise ValueError("metrics must contain a column to filter on")
+    return mask
 
-    # Run through each path and check whether the time spending
-    # on the path is equal to or larger than the time threshold
-    for path in paths:
-        start_time, end_time = T[path].ravel()
-        if (end_time - start_time) >= time_threshold:
-            pass_paths.append(path)
 
-    return(pass_paths)
+def filter_paths_by(movement, paths, min_duration=None, min_points=None,
+                    min_distance=None, min_speed=None, max_speed=None):
+    r"""
+    Return the start and end indices of the paths of a mouseday
+    passing all the given thresholds, as in filter_mask.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status
+        for the unique combination of strain, mouse and day
+    paths: numpy.ndarray
+        (n x 2) start and end indices of all paths, as returned by
+        path_index
+    min_duration, min_points, min_distance, min_speed, max_speed : float
+        positive thresholds, see filter_mask
+
+    Returns
+    -------
+    paths index : (m x 2) numpy.ndarray of the indices of the paths
+    passing the thresholds
+
+    Examples
+    --------
+    >>> movement = data.load_movement(1, 2, 1)
+    >>> paths = path_index(movement, 1, 1)
+    >>> paths = filter_paths_by(movement, paths, min_duration=5,
+    ...                         min_distance=20)
+    """
+    paths = np.asarray(paths, dtype=int).reshape((-1, 2))
+    dist, duration, speed = get_dist_speed_paths(movement, paths)
+    metrics = {'duration': duration, 'n_points': paths[:, 1] - paths[:, 0] + 1,
+               'distance': dist, 'mean_speed': speed}
+    return paths[filter_mask(metrics, min_duration, min_points,
+                             min_distance, min_speed, max_speed)]
+
+
+def filter_path_table(table, min_duration=None, min_points=None,
+                      min_distance=None, min_speed=None, max_speed=None):
+    r"""
+    Return the rows of a path table passing all the given thresholds,
+    as in filter_mask.
+
+    Parameters
+    ----------
+    table : pandas.DataFrame
+        the path table of path_table.get_path_table
+    min_duration, min_points, min_distance, min_speed, max_speed : float
+        positive thresholds, see filter_mask
+
+    Returns
+    -------
+    rows : numpy.ndarray of int, the positions of the passing rows,
+    e.g. for table.iloc[rows]
+
+    Examples
+    --------
+    >>> table = path_table.get_path_table()
+    >>> long_paths = table.iloc[filter_path_table(table, min_duration=20)]
+    """
+    return np.flatnonzero(filter_mask(table, min_duration, min_points,
+                                      min_distance, min_speed, max_speed))
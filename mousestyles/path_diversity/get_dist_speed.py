@@ -49,7 +49,9 @@ def get_dist_speed(movement, start, end, return_array=True):
     # Check whether inputs are valid.
     if (start < 0) or (end < 0):
         raise ValueError("Start and end indices must be positive")
-    if (type(start) != int) or (type(end) != int):
+    # path_index returns numpy integers
+    if not (isinstance(start, (int, np.integer)) and
+            isinstance(end, (int, np.integer))):
         raise TypeError("Start and end indices must be integers")
     if start > end:
         raise ValueError("Start index must be smaller than end index")
@@ -75,3 +77,99 @@ def get_dist_speed(movement, start, end, return_array=True):
         speed = dist / time
 
     return([dist, speed])
+
+
+def cumulative_distance(movement):
+    r"""
+    Return the distance travelled from the first observation up to
+    every observation, so that the distance covered between any two
+    observations i <= j is the difference of two entries.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status for the unique
+        combination of strain, mouse, and day, or for many mousedays
+        as returned by data.load_all_movement
+
+    Returns
+    -------
+    cum_dist : numpy.ndarray
+        cum_dist[i] is the distance covered from observation 0 to i
+
+    Examples
+    --------
+    >>> movement = data.load_movement(1, 2, 1)
+    >>> cum_dist = cumulative_distance(movement)
+    >>> print(cum_dist[3] - cum_dist[0])
+    0.37446593532030525
+    """
+    x = np.asarray(movement['x'], dtype=float)
+    y = np.asarray(movement['y'], dtype=float)
+    cum_dist = np.zeros(len(x))
+    np.cumsum(np.hypot(np.diff(x), np.diff(y)), out=cum_dist[1:])
+    return cum_dist
+
+
+def get_dist_speed_paths(movement, paths, cum_dist=None):
+    r"""
+    Return the distance, duration and average speed of many paths at
+    once, as get_dist_speed with return_array=False would for each of
+    them, from differences of cumulative distances.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status for the unique
+        combination of strain, mouse, and day, or for many mousedays
+        as returned by data.load_all_movement
+
+    paths : numpy.ndarray
+        (n x 2) start and end indices of the paths, as returned by
+        path_index or path_index_all
+
+    cum_dist : numpy.ndarray, optional
+        cumulative_distance(movement), computed if not given
+
+    Returns
+    -------
+    dist : numpy.ndarray, distances travelled along the paths
+
+    duration : numpy.ndarray, time spent on the paths
+
+    speed : numpy.ndarray, average speeds along the paths, 0 for
+        paths of a single observation
+
+    Examples
+    --------
+    >>> movement = data.load_movement(1, 2, 1)
+    >>> dist, duration, speed = get_dist_speed_paths(movement,
+    ...                                              np.array([[0, 3]]))
+    >>> print(dist[0])
+    0.37446593532030525
+    >>> print(speed[0])
+    0.09666131526088709
+    """
+    paths = np.asarray(paths)
+    if paths.ndim != 2 or paths.shape[1] != 2:
+        raise ValueError("paths must be an (n x 2) array")
+    if paths.dtype.kind not in 'iu':
+        raise TypeError("Start and end indices must be integers")
+    start, end = paths[:, 0], paths[:, 1]
+    if np.any(start < 0):
+        raise ValueError("Start and end indices must be positive")
+    if np.any(start > end):
+        raise ValueError("Start index must be smaller than end index")
+    if np.any(end > len(movement) - 1):
+        raise ValueError("Number of observations must be less than \
+        or equal to total observations")
+
+    if cum_dist is None:
+        cum_dist = cumulative_distance(movement)
+    t = np.asarray(movement['t'], dtype=float)
+    dist = cum_dist[end] - cum_dist[start]
+    duration = t[end] - t[start]
+    speed = np.zeros(len(paths))
+    moving = duration > 0
+    speed[moving] = dist[moving] / duration[moving]
+    return dist, duration, speed
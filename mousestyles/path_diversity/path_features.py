@@ -1,7 +1,6 @@
 from __future__ import print_function, absolute_import, division
 import numpy as np
 import pandas as pd
-import math
 
 
 def compute_accelerations(speeds, timestamps):
@@ -36,20 +35,18 @@ def compute_accelerations(speeds, timestamps):
     if not isinstance(speeds, list) or not isinstance(timestamps, list):
         raise TypeError("speeds and timestamps must be lists")
 
-    if len(speeds) is not len(timestamps) - 1:
+    if len(speeds) != len(timestamps) - 1:
         raise ValueError(
             "lengths of speeds must be the length of timestamps minus 1")
 
-    speeds_diff = [x - y for x, y in zip(speeds[:len(speeds)], speeds[1:])]
-    time_diffs = [x - y for x, y in zip(timestamps[:len(timestamps) - 1],
-                  timestamps[2:])]
-
+    timestamps = np.asarray(timestamps, dtype=float)
     test = "timestamps should not contain same times in i th and i+2 th rows."
-    if np.count_nonzero(time_diffs) is not len(time_diffs):
+    if np.any(timestamps[2:] == timestamps[:-2]):
         raise ValueError(test)
 
-    accel = [v / t for v, t in zip(speeds_diff, time_diffs)]
-    return(accel)
+    accel = compute_step_accelerations(np.asarray(speeds, dtype=float),
+                                       timestamps)
+    return(accel.tolist())
 
 
 def angle_between(v1, v2):
@@ -139,16 +136,165 @@ def compute_angles(path_obj, radian=False):
     if not isinstance(radian, bool):
         raise TypeError("radian must be bool")
 
-    indices = path_obj.index[:len(path_obj) - 1]
-    vectors = [path_obj.loc[i + 1, 'x':'y'] - path_obj.loc[i, 'x':'y']
-               for i in indices]
-    angles = [angle_between(list(v1), list(v2)) for v1, v2 in
-              zip(vectors[1:], vectors[:len(vectors)])]
+    angles = compute_turning_angles(path_obj['x'], path_obj['y'],
+                                    radian=radian)[1:-1]
+    if np.any(np.isnan(angles)):
+        raise ValueError('both vectors must have norms greater than 0')
+
+    # the first and last elements should be None
+    return([None] + angles.tolist() + [None])
+
+
+def compute_headings(x, y, radian=True):
+    r"""
+    Returns the heading of every step of a movement, i.e. the angle of
+    the displacement from each observation to the next one with the
+    x axis, for a whole mouseday at once.
+
+    Parameters
+    ----------
+    x, y : array_like
+        the coordinates of the n observations, e.g. the 'x' and 'y'
+        columns of data.load_movement.
+
+    radian : boolean
+        True for the output in radians, False for in turns.
 
+    Returns
+    -------
+    headings : numpy.ndarray
+        the n - 1 headings in (-pi, pi]; headings[i] is the heading of
+        the step from observation i to i + 1, nan for steps of zero
+        length. The steps of path [start, end] are
+        headings[start:end].
+
+    Examples
+    --------
+    >>> compute_headings([0, 1, 1, 1], [0, 0, 1, 1])
+    array([ 0.        ,  1.57079633,         nan])
+    """
+    dx = np.diff(np.asarray(x, dtype=float))
+    dy = np.diff(np.asarray(y, dtype=float))
+    headings = np.arctan2(dy, dx)
+    headings[(dx == 0) & (dy == 0)] = np.nan
     if not radian:
-        angles = [theta * 180 / math.pi for theta in angles]
+        headings = np.degrees(headings)
+    return headings
 
-    # the first and last elements should be None
-    angles.insert(len(angles), None)
-    angles.insert(0, None)
-    return(angles)
+
+def compute_turning_angles(x, y, radian=True, signed=False):
+    r"""
+    Returns the turning angle at every observation of a movement, i.e.
+    the angle between the steps arriving at and leaving from it, for a
+    whole mouseday at once.
+
+    The angle is computed as the arctangent of the cross and dot
+    products of the two steps, which is accurate for small and for
+    nearly opposite turns alike.
+
+    Parameters
+    ----------
+    x, y : array_like
+        the coordinates of the n observations, e.g. the 'x' and 'y'
+        columns of data.load_movement.
+
+    radian : boolean
+        True for the output in radians, False for in turns.
+
+    signed : boolean
+        True for angles in (-pi, pi], positive for left turns; False
+        for their absolute values, as compute_angles.
+
+    Returns
+    -------
+    angles : numpy.ndarray
+        the n turning angles; the first and last ones, and those next
+        to a step of zero length, are nan. The angles inside path
+        [start, end] are angles[start + 1:end].
+
+    Examples
+    --------
+    >>> compute_turning_angles([0, 1, 1, 0], [0, 0, 1, 1], radian=False)
+    array([ nan,  90.,  90.,  nan])
+    """
+    dx = np.diff(np.asarray(x, dtype=float))
+    dy = np.diff(np.asarray(y, dtype=float))
+    cross = dx[:-1] * dy[1:] - dy[:-1] * dx[1:]
+    dot = dx[:-1] * dx[1:] + dy[:-1] * dy[1:]
+    angles = np.empty(len(dx) + 1)
+    angles[[0, -1]] = np.nan
+    angles[1:-1] = np.arctan2(cross, dot)
+    still = (dx == 0) & (dy == 0)
+    angles[1:-1][still[:-1] | still[1:]] = np.nan
+    if not signed:
+        angles = np.abs(angles)
+    if not radian:
+        angles = np.degrees(angles)
+    return angles
+
+
+def compute_step_speeds(x, y, t):
+    r"""
+    Returns the speed of every step of a movement, for a whole
+    mouseday at once.
+
+    Parameters
+    ----------
+    x, y, t : array_like
+        the coordinates and times of the n observations, e.g. the
+        'x', 'y' and 't' columns of data.load_movement.
+
+    Returns
+    -------
+    speeds : numpy.ndarray
+        the n - 1 step lengths divided by the step durations; nan for
+        steps of zero duration. The steps of path [start, end] are
+        speeds[start:end].
+
+    Examples
+    --------
+    >>> compute_step_speeds([0, 3, 3], [0, 4, 4], [0, 1, 3])
+    array([ 5.,  0.])
+    """
+    dt = np.diff(np.asarray(t, dtype=float))
+    dist = np.hypot(np.diff(np.asarray(x, dtype=float)),
+                    np.diff(np.asarray(y, dtype=float)))
+    speeds = np.full(len(dt), np.nan)
+    moving = dt != 0
+    speeds[moving] = dist[moving] / dt[moving]
+    return speeds
+
+
+def compute_step_accelerations(speeds, t):
+    r"""
+    Returns the accelerations between consecutive steps of a movement,
+    as compute_accelerations, for a whole mouseday at once.
+
+    Parameters
+    ----------
+    speeds : array_like
+        the n - 1 step speeds, as returned by compute_step_speeds.
+
+    t : array_like
+        the times of the n observations.
+
+    Returns
+    -------
+    accel : numpy.ndarray
+        the n - 2 changes of speed between steps i and i + 1 divided by
+        the time from observation i to i + 2; nan when that time is
+        zero. The accelerations of path [start, end] are
+        accel[start:end - 1].
+
+    Examples
+    --------
+    >>> compute_step_accelerations([1, 2, 0], [3, 4, 5, 6])
+    array([ 0.5, -1. ])
+    """
+    speeds = np.asarray(speeds, dtype=float)
+    t = np.asarray(t, dtype=float)
+    dt = t[2:] - t[:-2]
+    accel = np.full(len(dt), np.nan)
+    moving = dt != 0
+    accel[moving] = np.diff(speeds)[moving] / dt[moving]
+    return accel
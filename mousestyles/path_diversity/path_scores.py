@@ -0,0 +1,194 @@
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import pandas as pd
+
+from mousestyles.data.utils import group_aggregate
+from mousestyles.path_diversity.get_dist_speed import cumulative_distance
+from mousestyles.path_diversity.spatial_index import (grid_cells,
+                                                      path_membership)
+
+
+def efficiency_scores(movement, paths, cum_dist=None):
+    r"""
+    Return the efficiency score of every path: the distance between
+    its first and last observations divided by the distance travelled
+    along it, 1 for a straight path and close to 0 for a path coming
+    back to where it started.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status of one mouseday, or
+        of many mousedays as returned by data.load_all_movement
+    paths : numpy.ndarray
+        (n x 2) start and end indices of the paths in movement, as
+        returned by path_index or path_index_all
+    cum_dist : numpy.ndarray, optional
+        get_dist_speed.cumulative_distance(movement), computed if not
+        given
+
+    Returns
+    -------
+    efficiency : numpy.ndarray, nan for paths of zero length
+
+    Examples
+    --------
+    >>> movement = data.load_movement(1, 2, 1)
+    >>> efficiency = efficiency_scores(movement, path_index(movement, 1, 1))
+    """
+    paths = np.asarray(paths, dtype=int).reshape((-1, 2))
+    start, end = paths[:, 0], paths[:, 1]
+    if cum_dist is None:
+        cum_dist = cumulative_distance(movement)
+    x = np.asarray(movement['x'], dtype=float)
+    y = np.asarray(movement['y'], dtype=float)
+    length = cum_dist[end] - cum_dist[start]
+    efficiency = np.full(len(paths), np.nan)
+    moving = length > 0
+    efficiency[moving] = np.hypot(x[end] - x[start],
+                                  y[end] - y[start])[moving] / length[moving]
+    return efficiency
+
+
+def exploration_scores(movement, paths, xbins=20, ybins=42):
+    r"""
+    Return the exploration score of every path: the number of distinct
+    cells of a uniform xbins x ybins grid over the cage that its
+    observations fall in.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status of one mouseday, or
+        of many mousedays as returned by data.load_all_movement
+    paths : numpy.ndarray
+        (n x 2) start and end indices of the paths in movement, sorted
+        and not overlapping, as returned by path_index or path_index_all
+    xbins : int
+        positive integer, number of cells along the x axis
+    ybins : int
+        positive integer, number of cells along the y axis
+
+    Returns
+    -------
+    exploration : numpy.ndarray of int
+
+    Examples
+    --------
+    >>> movement = data.load_movement(1, 2, 1)
+    >>> exploration = exploration_scores(movement,
+    ...                                  path_index(movement, 1, 1))
+    """
+    if type(xbins) != int or type(ybins) != int:
+        raise TypeError("xbins and ybins need to be integer")
+    if xbins <= 0 or ybins <= 0:
+        raise ValueError("xbins and ybins need to be positive")
+    paths = np.asarray(paths, dtype=int).reshape((-1, 2))
+    path_ids = path_membership(len(movement), paths)
+    inside = path_ids >= 0
+    cells = grid_cells(np.asarray(movement['x'])[inside],
+                       np.asarray(movement['y'])[inside], xbins, ybins)
+    # one key per (path, cell) pair, counted once per path
+    visited = np.unique(path_ids[inside] * (xbins * ybins) + cells)
+    return np.bincount(visited // (xbins * ybins), minlength=len(paths))
+
+
+def path_scores(movement, paths, xbins=20, ybins=42):
+    r"""
+    Return the efficiency and exploration scores of every path.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status of one mouseday, or
+        of many mousedays as returned by data.load_all_movement
+    paths : numpy.ndarray
+        (n x 2) start and end indices of the paths in movement, sorted
+        and not overlapping, as returned by path_index or path_index_all
+    xbins : int
+        positive integer, number of cells along the x axis
+    ybins : int
+        positive integer, number of cells along the y axis
+
+    Returns
+    -------
+    scores : pandas.DataFrame
+        one row per path with columns start, stop, efficiency and
+        exploration, preceded by strain, mouse and day when movement
+        has them
+
+    Examples
+    --------
+    >>> movement = data.load_all_movement()
+    >>> scores = path_scores(movement, path_index_all(movement, 1, 1))
+    """
+    paths = np.asarray(paths, dtype=int).reshape((-1, 2))
+    scores = pd.DataFrame()
+    for c in ['strain', 'mouse', 'day']:
+        if c in movement:
+            scores[c] = np.asarray(movement[c])[paths[:, 0]]
+    scores['start'] = paths[:, 0]
+    scores['stop'] = paths[:, 1]
+    scores['efficiency'] = efficiency_scores(movement, paths)
+    scores['exploration'] = exploration_scores(movement, paths, xbins,
+                                               ybins)
+    return scores
+
+
+def aggregate_path_scores(scores, by='mouseday'):
+    r"""
+    Return the mean, standard deviation and standard error of the path
+    scores of every mouseday or every strain, as data.utils
+    group_aggregate. Paths of zero length, whose efficiency is not
+    defined, are left out of the efficiency statistics only.
+
+    Parameters
+    ----------
+    scores : pandas.DataFrame
+        path scores with columns strain, mouse, day, efficiency and
+        exploration, as returned by path_scores
+    by : str
+        'mouseday' or 'strain'
+
+    Returns
+    -------
+    aggregate : pandas.DataFrame
+        one row per group with the key columns, then efficiency_mean,
+        efficiency_std, efficiency_stderr, exploration_mean,
+        exploration_std, exploration_stderr, efficiency_count (the
+        number of paths of nonzero length) and count (the number of
+        paths)
+
+    Examples
+    --------
+    >>> movement = data.load_all_movement()
+    >>> scores = path_scores(movement, path_index_all(movement, 1, 1))
+    >>> aggregate_path_scores(scores, by='strain')
+    """
+    if by not in ('mouseday', 'strain'):
+        raise ValueError("by should be 'mouseday' or 'strain'")
+    key_columns = ['strain', 'mouse', 'day'] if by == 'mouseday' \
+        else ['strain']
+    keys = scores[key_columns]
+    efficiency = np.asarray(scores['efficiency'], dtype=float)
+    defined = np.isfinite(efficiency)
+    groups, mean, std, stderr, count = group_aggregate(
+        np.column_stack((scores['exploration'], defined)), keys)
+    n_defined = np.round(mean[:, 1] * count).astype(int)
+    # undefined efficiencies get no weight, in the same groups
+    _, efficiency_mean, efficiency_std, _, _ = group_aggregate(
+        np.where(defined, efficiency, 0), keys, weights=defined)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        efficiency_stderr = efficiency_std / np.sqrt(n_defined - 1)
+
+    aggregate = pd.DataFrame(groups, columns=key_columns)
+    aggregate['efficiency_mean'] = efficiency_mean
+    aggregate['efficiency_std'] = efficiency_std
+    aggregate['efficiency_stderr'] = efficiency_stderr
+    aggregate['exploration_mean'] = mean[:, 0]
+    aggregate['exploration_std'] = std[:, 0]
+    aggregate['exploration_stderr'] = stderr[:, 0]
+    aggregate['efficiency_count'] = n_defined
+    aggregate['count'] = count
+    return aggregate
@@ -0,0 +1,220 @@
+from __future__ import print_function, absolute_import, division
+
+import multiprocessing
+
+import numpy as np
+
+from mousestyles.path_diversity.resample_path import resample_paths
+
+
+def path_distance_matrix(movement, paths, n_points=32, window=4,
+                         max_distance=None, n_jobs=1, chunk_size=4096):
+    r"""
+    Return the pairwise dynamic time warping (DTW) distances between
+    paths, as a condensed distance matrix for clustering, e.g. with
+    scipy.cluster.hierarchy.linkage.
+
+    Every path is resampled to n_points points equally spaced along
+    it with resample_path.resample_paths. The distance between two
+    paths is the smallest sum of the distances between matched points
+    over the warpings that match points at most `window` positions
+    apart. When max_distance is given, pairs whose cheap lower bound
+    (the distance between their endpoints, or between the points of
+    one path and the bounding boxes of the matching windows of the
+    other) already exceeds max_distance are not computed exactly:
+    their entry holds the lower bound instead, which is still larger
+    than max_distance.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status of one mouseday, or
+        of many mousedays as returned by data.load_all_movement
+    paths : numpy.ndarray
+        (n x 2) start and end indices of the paths in movement, as
+        returned by path_index or path_index_all
+    n_points : int
+        positive integer, number of points of the resampled paths
+    window : int
+        nonnegative integer, largest difference between the positions
+        of two matched points
+    max_distance : float, optional
+        distances known to be larger are not computed exactly
+    n_jobs : int
+        positive integer, number of worker processes
+    chunk_size : int
+        positive integer, number of pairs computed at once
+
+    Returns
+    -------
+    distances : numpy.ndarray
+        float32 array of length n * (n - 1) / 2 holding the distance
+        between paths i < j at position
+        n * i - i * (i + 1) / 2 + j - i - 1, as scipy.spatial.distance
+
+    Examples
+    --------
+    >>> movement = data.load_movement(1, 2, 1)
+    >>> paths = filter_paths(movement, path_index(movement, 1, 1), 5)
+    >>> distances = path_distance_matrix(movement, paths, max_distance=50)
+    """
+    if type(n_points) != int or n_points <= 0:
+        raise ValueError("n_points should be positive int")
+    if type(window) != int or window < 0:
+        raise ValueError("window should be nonnegative int")
+    if type(n_jobs) != int or n_jobs <= 0:
+        raise ValueError("n_jobs should be positive int")
+    if type(chunk_size) != int or chunk_size <= 0:
+        raise ValueError("chunk_size should be positive int")
+
+    resampled, _ = resample_paths(movement, paths, n_points)
+    resampled = resampled.astype(float)
+    n = len(resampled)
+    distances = np.zeros(n * (n - 1) // 2, dtype=np.float32)
+    if max_distance is None:
+        first, second = np.triu_indices(n, 1)
+        todo = np.arange(len(distances))
+    else:
+        first, second, todo = _prune_pairs(resampled, window, max_distance,
+                                           distances)
+
+    # a few chunks per worker at a time keeps the copies of the
+    # resampled paths small
+    starts = list(range(0, len(todo), chunk_size))
+    batch = 4 * n_jobs
+    pool = multiprocessing.Pool(n_jobs) if n_jobs > 1 else None
+    try:
+        for b in range(0, len(starts), batch):
+            tasks = [(resampled[first[k:k + chunk_size]],
+                      resampled[second[k:k + chunk_size]], window)
+                     for k in starts[b:b + batch]]
+            if pool is None:
+                results = [_dtw_task(task) for task in tasks]
+            else:
+                results = pool.map(_dtw_task, tasks)
+            for k, result in zip(starts[b:b + batch], results):
+                distances[todo[k:k + chunk_size]] = result
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return distances
+
+
+def dtw_distance(path_1, path_2, window=None):
+    r"""
+    Return the dynamic time warping distance between paths of the same
+    number of points, for many pairs of paths at once.
+
+    Parameters
+    ----------
+    path_1, path_2 : numpy.ndarray
+        (k x 2) coordinates of two paths, or (n x k x 2) coordinates of
+        n pairs of paths
+    window : int, optional
+        largest difference between the positions of two matched
+        points; no limit by default
+
+    Returns
+    -------
+    distance : float or numpy.ndarray
+        the smallest sum of the distances between matched points, one
+        per pair of paths
+
+    Examples
+    --------
+    >>> dtw_distance([[0, 0], [1, 0], [2, 0]], [[0, 1], [1, 1], [2, 1]])
+    3.0
+    """
+    path_1 = np.asarray(path_1, dtype=float)
+    path_2 = np.asarray(path_2, dtype=float)
+    if path_1.shape != path_2.shape or path_1.shape[-1] != 2:
+        raise ValueError("paths must have the same number of 2-d points")
+    single = path_1.ndim == 2
+    if single:
+        path_1, path_2 = path_1[np.newaxis], path_2[np.newaxis]
+    k = path_1.shape[1]
+    if window is None:
+        window = k
+    cost = np.sqrt(((path_1[:, :, np.newaxis, :] -
+                     path_2[:, np.newaxis, :, :]) ** 2).sum(axis=3))
+    # cumulative cost, with a border of inf for the first row and column
+    total = np.full((len(path_1), k + 1, k + 1), np.inf)
+    total[:, 0, 0] = 0
+    # the cells of an anti-diagonal i + j = d only depend on earlier ones
+    for d in range(2, 2 * k + 1):
+        i = np.arange(max(1, d - k), min(k, d - 1) + 1)
+        i = i[np.abs(2 * i - d) <= window]
+        j = d - i
+        total[:, i, j] = cost[:, i - 1, j - 1] + np.minimum(
+            np.minimum(total[:, i - 1, j], total[:, i, j - 1]),
+            total[:, i - 1, j - 1])
+    distance = total[:, k, k]
+    if single:
+        return distance[0]
+    return distance
+
+
+def _dtw_task(task):
+    path_1, path_2, window = task
+    return dtw_distance(path_1, path_2, window)
+
+
+def _prune_pairs(resampled, window, max_distance, distances):
+    """
+    Write the lower bounds of all pairs into distances and return the
+    (first, second, position) of the pairs whose lower bound does not
+    exceed max_distance.
+    """
+    n = len(resampled)
+    low, high = _envelopes(resampled, window)
+    first, second, todo = [], [], []
+    position = 0
+    for i in range(n - 1):
+        others = np.arange(i + 1, n)
+        path = resampled[i]
+        ends = (np.sqrt(((resampled[others, 0] - path[0]) ** 2).sum(1)) +
+                np.sqrt(((resampled[others, -1] - path[-1]) ** 2).sum(1)))
+        if resampled.shape[1] == 1:
+            ends /= 2
+        bound = np.maximum(ends, np.maximum(
+            _box_distance(path, low[others], high[others]),
+            _box_distance(resampled[others], low[i], high[i])))
+        distances[position:position + len(others)] = bound
+        keep = bound <= max_distance
+        first.append(np.repeat(i, keep.sum()))
+        second.append(others[keep])
+        todo.append(position + np.flatnonzero(keep))
+        position += len(others)
+    if n < 2:
+        empty = np.zeros(0, dtype=int)
+        return empty, empty, empty
+    return np.concatenate(first), np.concatenate(second), np.concatenate(todo)
+
+
+def _envelopes(resampled, window):
+    """
+    Return the lower and upper corners of the bounding boxes of the
+    points k - window to k + window of every resampled path.
+    """
+    low = resampled.copy()
+    high = resampled.copy()
+    k = resampled.shape[1]
+    for shift in range(1, min(window, k - 1) + 1):
+        np.minimum(low[:, shift:], resampled[:, :-shift], out=low[:, shift:])
+        np.minimum(low[:, :-shift], resampled[:, shift:],
+                   out=low[:, :-shift])
+        np.maximum(high[:, shift:], resampled[:, :-shift],
+                   out=high[:, shift:])
+        np.maximum(high[:, :-shift], resampled[:, shift:],
+                   out=high[:, :-shift])
+    return low, high
+
+
+def _box_distance(points, low, high):
+    """
+    Return the sum over k of the distances from points[..., k, :] to the
+    boxes [low[..., k, :], high[..., k, :]].
+    """
+    outside = np.maximum(np.maximum(low - points, points - high), 0)
+    return np.sqrt((outside ** 2).sum(axis=-1)).sum(axis=-1)
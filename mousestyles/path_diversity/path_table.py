@@ -0,0 +1,206 @@
+from __future__ import print_function, absolute_import, division
+
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from mousestyles import data
+from mousestyles.data.utils import run_offsets
+from mousestyles.path_diversity import path_index
+from mousestyles.path_diversity.get_dist_speed import get_dist_speed_paths
+from mousestyles.path_diversity.path_features import (compute_step_speeds,
+                                                      compute_turning_angles)
+
+PATH_TABLE_COLUMNS = ['strain', 'mouse', 'day', 'start', 'stop',
+                      'start_time', 'stop_time', 'n_points', 'distance',
+                      'duration', 'mean_speed', 'max_speed',
+                      'mean_abs_angle', 'straightness', 'start_hb',
+                      'stop_hb']
+
+
+def get_path_table(movement=None, stop_threshold=1, min_path_length=1,
+                   n_jobs=1, out=None):
+    r"""
+    Return a table with one row per path of every mouseday, holding
+    the features of the path.
+
+    The mousedays are processed independently by a pool of n_jobs
+    worker processes; within a mouseday all paths are handled at once
+    with the array functions of get_dist_speed and path_features.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame, optional
+        strain, mouse, day, CT, CX, CY coordinates and homebase status
+        of many mousedays, as returned by data.load_all_movement. If
+        not given, every worker loads its own mousedays.
+    stop_threshold : float
+        positive number indicating the path cutoff criteria, as in
+        path_index
+    min_path_length : int
+        positive integer indicating how many observations in
+        a path, as in path_index
+    n_jobs : int
+        positive integer, number of worker processes
+    out : str, optional
+        file name to save the table to with save_path_table
+
+    Returns
+    -------
+    table : pandas.DataFrame
+        one row per path with columns
+        strain, mouse, day : the mouseday of the path
+        start, stop : the indices of the first and last observations
+            of the path within the movement of its mouseday
+        start_time, stop_time : the times of these observations
+        n_points : the number of observations of the path
+        distance, duration, mean_speed : as get_dist_speed_paths
+        max_speed : the largest speed of a step of the path
+        mean_abs_angle : the mean absolute turning angle inside the
+            path in radians, ignoring steps of zero length
+        straightness : the distance between the first and the last
+            observations divided by the distance travelled
+        start_hb, stop_hb : the home base status of the first and
+            last observations
+
+    Examples
+    --------
+    >>> table = get_path_table(n_jobs=4)
+    >>> table.groupby('strain')['distance'].mean()
+    """
+    conditions_value = [stop_threshold <= 0, min_path_length <= 0]
+    if any(conditions_value):
+        raise ValueError("Input values need to be positive")
+    if type(min_path_length) != int:
+        raise TypeError("min_path_length needs to be integer")
+    if type(n_jobs) != int or n_jobs <= 0:
+        raise ValueError("n_jobs should be positive int")
+
+    if movement is None:
+        tasks = [(tuple(int(k) for k in label), None, stop_threshold,
+                  min_path_length) for label in data.load_mouseday_labels()]
+    else:
+        labels, offsets = run_offsets(movement[['strain', 'mouse', 'day']])
+        columns = movement[['t', 'x', 'y', 'isHB']]
+        tasks = [(tuple(int(k) for k in labels[i]),
+                  columns.iloc[offsets[i]:offsets[i + 1]],
+                  stop_threshold, min_path_length)
+                 for i in range(len(labels))]
+    if n_jobs == 1:
+        tables = [_mouseday_path_table(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(n_jobs)
+        try:
+            tables = pool.map(_mouseday_path_table, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    table = pd.DataFrame(dict(
+        (c, np.concatenate([t[c] for t in tables]))
+        for c in PATH_TABLE_COLUMNS), columns=PATH_TABLE_COLUMNS)
+    if out is not None:
+        save_path_table(table, out)
+    return table
+
+
+def _mouseday_path_table(task):
+    """
+    Return the columns of the path table of one mouseday as a
+    dictionary of arrays. `task` is the tuple (label, movement,
+    stop_threshold, min_path_length); the movement of the mouseday
+    with the given strain, mouse and day label is loaded if None.
+    """
+    label, movement, stop_threshold, min_path_length = task
+    if movement is None:
+        movement = data.load_movement(*label)
+    movement = movement.reset_index(drop=True)
+    paths = path_index(movement, stop_threshold, min_path_length)
+    start, stop = paths[:, 0], paths[:, 1]
+    t = np.asarray(movement['t'], dtype=float)
+    x = np.asarray(movement['x'], dtype=float)
+    y = np.asarray(movement['y'], dtype=float)
+    is_hb = np.asarray(movement['isHB'], dtype=bool)
+
+    columns = {}
+    for c, value in zip(['strain', 'mouse', 'day'], label):
+        columns[c] = np.repeat(value, len(paths))
+    columns['start'] = start
+    columns['stop'] = stop
+    columns['start_time'] = t[start]
+    columns['stop_time'] = t[stop]
+    columns['n_points'] = stop - start + 1
+    dist, duration, speed = get_dist_speed_paths(movement, paths)
+    columns['distance'] = dist
+    columns['duration'] = duration
+    columns['mean_speed'] = speed
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns['straightness'] = np.hypot(x[stop] - x[start],
+                                           y[stop] - y[start]) / dist
+    if len(paths) == 0:
+        columns['max_speed'] = np.zeros(0)
+        columns['mean_abs_angle'] = np.zeros(0)
+    else:
+        # reduce over the steps start:stop, and the turning angles at
+        # the observations start + 1:stop, of every path; paths have at
+        # least 2 steps and the padding keeps stop a valid index
+        steps = np.column_stack((start, stop)).ravel()
+        inner = np.column_stack((start + 1, stop)).ravel()
+        speeds = np.append(compute_step_speeds(x, y, t), np.nan)
+        columns['max_speed'] = np.fmax.reduceat(speeds, steps)[::2]
+        angles = compute_turning_angles(x, y)
+        known = ~np.isnan(angles)
+        total = np.add.reduceat(np.where(known, angles, 0), inner)[::2]
+        count = np.add.reduceat(known.astype(int), inner)[::2]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns['mean_abs_angle'] = total / count
+    columns['start_hb'] = is_hb[start]
+    columns['stop_hb'] = is_hb[stop]
+    return columns
+
+
+def save_path_table(table, file_name):
+    r"""
+    Save a path table, one compressed array per column, to a .npz file
+    that load_path_table reads back.
+
+    Parameters
+    ----------
+    table : pandas.DataFrame
+        path table as returned by get_path_table
+    file_name : str
+        name of the .npz file
+
+    Examples
+    --------
+    >>> save_path_table(get_path_table(), 'paths.npz')
+    """
+    arrays = dict(('column_' + c, np.asarray(table[c])) for c in table)
+    np.savez_compressed(file_name, columns=np.array(list(table.columns)),
+                        **arrays)
+
+
+def load_path_table(file_name):
+    r"""
+    Load a path table saved by save_path_table.
+
+    Parameters
+    ----------
+    file_name : str
+        name of the .npz file
+
+    Returns
+    -------
+    table : pandas.DataFrame
+        the saved path table
+
+    Examples
+    --------
+    >>> table = load_path_table('paths.npz')
+    """
+    saved = np.load(file_name)
+    columns = [str(c) for c in saved['columns']]
+    return pd.DataFrame(dict((c, saved['column_' + c]) for c in columns),
+                        columns=columns)
@@ -0,0 +1,98 @@
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import pandas as pd
+
+from mousestyles.path_diversity.get_dist_speed import cumulative_distance
+
+
+def resample_paths(movement, paths, n_points, by='arc_length'):
+    r"""
+    Return every path resampled to the same number of points, as one
+    dense array, together with a table describing the paths.
+
+    The points are equally spaced along the path (by='arc_length') or
+    in time (by='time'), and their coordinates are interpolated
+    linearly between the observations. All paths are interpolated at
+    once, without a loop over the paths.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates and homebase status of one mouseday, or
+        of many mousedays as returned by data.load_all_movement
+    paths : numpy.ndarray
+        (n x 2) start and end indices of the paths in movement, as
+        returned by path_index or path_index_all
+    n_points : int
+        positive integer, number of points of the resampled paths
+    by : str
+        'arc_length' or 'time', how the points are spaced
+
+    Returns
+    -------
+    resampled : numpy.ndarray
+        float32 array of shape (n, n_points, 2) of the x and y
+        coordinates of the points of every path
+    metadata : pandas.DataFrame
+        one row per path with columns start, stop, start_time,
+        stop_time, length (the distance travelled) and duration,
+        preceded by strain, mouse and day when movement has them
+
+    Examples
+    --------
+    >>> movement = data.load_movement(1, 2, 1)
+    >>> paths = path_index(movement, 1, 1)
+    >>> resampled, metadata = resample_paths(movement, paths, 16)
+    >>> resampled.shape
+    (3127, 16, 2)
+    """
+    if type(n_points) != int or n_points <= 0:
+        raise ValueError("n_points should be positive int")
+    if by not in ('arc_length', 'time'):
+        raise ValueError("by should be 'arc_length' or 'time'")
+    paths = np.asarray(paths, dtype=int).reshape((-1, 2))
+    start, end = paths[:, 0], paths[:, 1]
+    if len(paths) and (np.any(start < 0) or np.any(start > end) or
+                       np.any(end > len(movement) - 1)):
+        raise ValueError("paths must be indices of movement")
+
+    x = np.asarray(movement['x'], dtype=float)
+    y = np.asarray(movement['y'], dtype=float)
+    t = np.asarray(movement['t'], dtype=float)
+    cum_dist = cumulative_distance(movement)
+    if by == 'arc_length':
+        position = cum_dist
+    else:
+        # times restart with every mouseday; only increasing steps are
+        # kept so that the position never decreases
+        position = np.zeros(len(t))
+        np.cumsum(np.maximum(np.diff(t), 0), out=position[1:])
+
+    fraction = np.linspace(0, 1, n_points)
+    target = (position[start, np.newaxis] + fraction *
+              (position[end] - position[start])[:, np.newaxis])
+    # the step of the path each target position falls in
+    step = np.searchsorted(position, target, side='right') - 1
+    step = np.clip(step, start[:, np.newaxis],
+                   np.maximum(end - 1, start)[:, np.newaxis])
+    following = np.minimum(step + 1, end[:, np.newaxis])
+    width = position[following] - position[step]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = np.where(width > 0, (target - position[step]) / width, 0)
+    weight = np.clip(weight, 0, 1)
+    resampled = np.empty(target.shape + (2,), dtype=np.float32)
+    resampled[..., 0] = x[step] + weight * (x[following] - x[step])
+    resampled[..., 1] = y[step] + weight * (y[following] - y[step])
+
+    metadata = pd.DataFrame()
+    for c in ['strain', 'mouse', 'day']:
+        if c in movement:
+            metadata[c] = np.asarray(movement[c])[start]
+    metadata['start'] = start
+    metadata['stop'] = end
+    metadata['start_time'] = t[start]
+    metadata['stop_time'] = t[end]
+    metadata['length'] = cum_dist[end] - cum_dist[start]
+    metadata['duration'] = t[end] - t[start]
+    return resampled, metadata
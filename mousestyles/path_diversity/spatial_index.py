@@ -0,0 +1,222 @@
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+
+from mousestyles.behavior.home_base import CAGE_XLIMS, CAGE_YLIMS
+
+
+class SpatialIndex(object):
+    r"""
+    Uniform grid over the cage holding the observations of many
+    mousedays, to find the observations or paths that pass through a
+    region of the cage during a time window without scanning them all.
+
+    The observations are sorted by grid cell and by time within each
+    cell, so a query only looks at the cells overlapping the region and,
+    in each of them, at the observations within the time window.
+
+    Parameters
+    ----------
+    movement : pandas.DataFrame
+        CT, CX, CY coordinates of the observations, e.g. of all
+        mousedays as returned by data.load_all_movement
+    paths : numpy.ndarray, optional
+        (n x 2) start and end rows in movement of the paths, as
+        returned by path_index_all; needed by query_paths
+    xbins : int
+        positive integer, number of cells along the x axis
+    ybins : int
+        positive integer, number of cells along the y axis
+
+    Examples
+    --------
+    >>> movement = data.load_all_movement()
+    >>> index = SpatialIndex(movement, path_index_all(movement, 1, 1))
+    >>> rows = index.query_samples((-5, -3), (30, 35), (60000, 61000))
+    >>> path_ids = index.query_paths((-5, -3), (30, 35))
+    """
+
+    def __init__(self, movement, paths=None, xbins=20, ybins=42):
+        if type(xbins) != int or type(ybins) != int:
+            raise TypeError("xbins and ybins need to be integer")
+        if xbins <= 0 or ybins <= 0:
+            raise ValueError("xbins and ybins need to be positive")
+        self.xbins = xbins
+        self.ybins = ybins
+        x = np.asarray(movement['x'], dtype=float)
+        y = np.asarray(movement['y'], dtype=float)
+        t = np.asarray(movement['t'], dtype=float)
+        cell = grid_cells(x, y, xbins, ybins)
+        self.rows = np.lexsort((t, cell))
+        self.x = x[self.rows]
+        self.y = y[self.rows]
+        self.t = t[self.rows]
+        self.cell_starts = np.searchsorted(cell[self.rows],
+                                           np.arange(xbins * ybins + 1))
+        if paths is None:
+            self.path_ids = None
+        else:
+            self.path_ids = path_membership(len(x), paths)[self.rows]
+
+    def _query(self, xlims, ylims, tlims):
+        """ Return the positions of the matching observations. """
+        (x0, x1), (y0, y1) = xlims, ylims
+        if x0 > x1 or y0 > y1:
+            raise ValueError("lower limits must not exceed upper limits")
+        corners = grid_cells([x0, x1], [y0, y1], self.xbins, self.ybins)
+        col0, col1 = corners % self.xbins
+        row0, row1 = corners // self.xbins
+        found = []
+        for row in range(row0, row1 + 1):
+            first = row * self.xbins
+            if tlims is None:
+                # the cells of a row of the grid are contiguous
+                found.append(np.arange(self.cell_starts[first + col0],
+                                       self.cell_starts[first + col1 + 1]))
+                continue
+            for cell in range(first + col0, first + col1 + 1):
+                lo, hi = self.cell_starts[cell], self.cell_starts[cell + 1]
+                # times are sorted within a cell
+                times = self.t[lo:hi]
+                found.append(np.arange(
+                    lo + np.searchsorted(times, tlims[0], 'left'),
+                    lo + np.searchsorted(times, tlims[1], 'right')))
+        found = np.concatenate(found)
+        inside = ((self.x[found] >= x0) & (self.x[found] <= x1) &
+                  (self.y[found] >= y0) & (self.y[found] <= y1))
+        return found[inside]
+
+    def query_samples(self, xlims, ylims, tlims=None):
+        r"""
+        Return the observations in the rectangle xlims x ylims
+        (bounds included), optionally only those with times in tlims.
+
+        Parameters
+        ----------
+        xlims, ylims : tuple
+            (lower, upper) bounds of the region
+        tlims : tuple, optional
+            (first, last) times of the window
+
+        Returns
+        -------
+        rows : numpy.ndarray of int, the sorted rows in movement
+        """
+        return np.sort(self.rows[self._query(xlims, ylims, tlims)])
+
+    def query_paths(self, xlims, ylims, tlims=None):
+        r"""
+        Return the paths with at least one observation in the
+        rectangle xlims x ylims, optionally during the window tlims.
+
+        Parameters
+        ----------
+        xlims, ylims : tuple
+            (lower, upper) bounds of the region
+        tlims : tuple, optional
+            (first, last) times of the window
+
+        Returns
+        -------
+        path_ids : numpy.ndarray of int, the sorted rows of the paths
+            in the paths array given to the index
+        """
+        if self.path_ids is None:
+            raise ValueError("the index was built without paths")
+        path_ids = self.path_ids[self._query(xlims, ylims, tlims)]
+        return np.unique(path_ids[path_ids >= 0])
+
+    def save(self, file_name):
+        r"""
+        Save the index to a .npz file, e.g. next to the path table
+        saved by path_table.save_path_table.
+        """
+        arrays = dict(xbins=self.xbins, ybins=self.ybins, rows=self.rows,
+                      x=self.x, y=self.y, t=self.t,
+                      cell_starts=self.cell_starts)
+        if self.path_ids is not None:
+            arrays['path_ids'] = self.path_ids
+        np.savez(file_name, **arrays)
+
+    @classmethod
+    def load(cls, file_name):
+        r"""
+        Load an index saved by save.
+        """
+        saved = np.load(file_name)
+        index = cls.__new__(cls)
+        index.xbins = int(saved['xbins'])
+        index.ybins = int(saved['ybins'])
+        for name in ['rows', 'x', 'y', 't', 'cell_starts']:
+            setattr(index, name, saved[name])
+        index.path_ids = None
+        if 'path_ids' in saved.files:
+            index.path_ids = saved['path_ids']
+        return index
+
+
+def grid_cells(x, y, xbins=20, ybins=42):
+    r"""
+    Return the cell of a uniform xbins x ybins grid over the cage
+    holding each point, as the flat index col + xbins * row, where
+    col and row count from the lowest x and y. Points outside the cage
+    are put in the nearest cell.
+
+    Parameters
+    ----------
+    x, y : array_like
+        coordinates of the points
+    xbins : int
+        positive integer, number of cells along the x axis
+    ybins : int
+        positive integer, number of cells along the y axis
+
+    Returns
+    -------
+    cells : numpy.ndarray of int
+
+    Examples
+    --------
+    >>> grid_cells([-16, 3], [2, 42], xbins=2, ybins=4).tolist()
+    [0, 7]
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    col = (x - CAGE_XLIMS[0]) * xbins / (CAGE_XLIMS[1] - CAGE_XLIMS[0])
+    row = (y - CAGE_YLIMS[0]) * ybins / (CAGE_YLIMS[1] - CAGE_YLIMS[0])
+    col = np.clip(np.floor(col), 0, xbins - 1).astype(int)
+    row = np.clip(np.floor(row), 0, ybins - 1).astype(int)
+    return col + xbins * row
+
+
+def path_membership(n_rows, paths):
+    r"""
+    Return the path containing each observation of a movement table.
+
+    Parameters
+    ----------
+    n_rows : int
+        number of observations, i.e. rows of the movement table
+    paths : numpy.ndarray
+        (n x 2) start and end rows of the paths, sorted and not
+        overlapping, as returned by path_index or path_index_all
+
+    Returns
+    -------
+    path_ids : numpy.ndarray of int
+        the row of paths containing each observation, or -1 for the
+        observations outside all paths
+
+    Examples
+    --------
+    >>> path_membership(6, [[1, 2], [4, 5]]).tolist()
+    [-1, 0, 0, -1, 1, 1]
+    """
+    paths = np.asarray(paths, dtype=int).reshape((-1, 2))
+    inside = np.zeros(n_rows + 1, dtype=int)
+    np.add.at(inside, paths[:, 0], 1)
+    np.add.at(inside, paths[:, 1] + 1, -1)
+    rows = np.arange(n_rows)
+    path_ids = np.searchsorted(paths[:, 0], rows, side='right') - 1
+    path_ids[np.cumsum(inside[:-1]) == 0] = -1
+    return path_ids
@@ -1,6 +1,7 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -39,3 +40,39 @@ def test_dist_speed():
     dist, speed = get_dist_speed.get_dist_speed(movement, 0, 2)
     assert dist[0] == 1.0 and dist[1] == 2.0 and speed[0] == 1.0 and\
         speed[1] == 2.0
+
+
+def test_dist_speed_paths():
+    movement = pd.DataFrame([[1, 1, 1], [2, 2, 1], [3, 2, 3], [5, 2, 3]])
+    movement.columns = ['t', 'x', 'y']
+    cum_dist = get_dist_speed.cumulative_distance(movement)
+    np.testing.assert_allclose(cum_dist, [0, 1, 3, 3])
+    paths = np.array([[0, 2], [1, 3], [2, 2]])
+    dist, duration, speed = get_dist_speed.get_dist_speed_paths(movement,
+                                                                paths)
+    np.testing.assert_allclose(dist, [3, 2, 0])
+    np.testing.assert_allclose(duration, [2, 3, 0])
+    np.testing.assert_allclose(speed, [1.5, 2. / 3, 0])
+    # same as one get_dist_speed call per path
+    movement = data.load_movement(0, 0, 0)
+    paths = np.array([[0, 5], [100, 180], [2000, 2001]])
+    dist, duration, speed = get_dist_speed.get_dist_speed_paths(movement,
+                                                                paths)
+    for i, (start, end) in enumerate(paths):
+        expected = get_dist_speed.get_dist_speed(movement, int(start),
+                                                 int(end), False)
+        np.testing.assert_allclose([dist[i], speed[i]], expected)
+
+
+def test_dist_speed_paths_input():
+    movement = data.load_movement(0, 0, 0)
+    with pytest.raises(ValueError) as excinfo:
+        get_dist_speed.get_dist_speed_paths(movement, np.array([[-1, 2]]))
+    assert excinfo.value.args[0] == "Start and end indices must be positive"
+    with pytest.raises(ValueError) as excinfo:
+        get_dist_speed.get_dist_speed_paths(movement, np.array([[5, 2]]))
+    assert excinfo.value.args[
+        0] == "Start index must be smaller than end index"
+    with pytest.raises(TypeError) as excinfo:
+        get_dist_speed.get_dist_speed_paths(movement, np.array([[.5, 2]]))
+    assert excinfo.value.args[0] == "Start and end indices must be integers"
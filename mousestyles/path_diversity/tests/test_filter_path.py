@@ -1,11 +1,14 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from mousestyles import data
 from mousestyles.path_diversity import path_index
 from mousestyles.path_diversity import filter_path
+from mousestyles.path_diversity.get_dist_speed import get_dist_speed
 
 
 def test_filter_path_input():
@@ -27,4 +30,41 @@ def test_filter_path():
     paths = path_index(movement, 1, 1)
     # Checking functions output the correct path
     pass_paths = filter_path.filter_paths(movement, paths, 20)
-    assert pass_paths == [[3082, 3181], [30835, 30970], [31346, 31557]]
+    assert np.asarray(pass_paths).tolist() == [[3082, 3181], [30835, 30970],
+                                               [31346, 31557]]
+
+
+def test_filter_mask():
+    metrics = pd.DataFrame({'duration': [1., 30, 25, 40],
+                            'n_points': [3, 50, 4, 80],
+                            'distance': [20., 5, 30, 60],
+                            'mean_speed': [20., 1. / 6, 1.2, 1.5]})
+    mask = filter_path.filter_mask(metrics, min_duration=20)
+    assert mask.tolist() == [False, True, True, True]
+    mask = filter_path.filter_mask(metrics, min_duration=20, min_points=10,
+                                   min_distance=10, max_speed=2)
+    assert mask.tolist() == [False, False, False, True]
+    mask = filter_path.filter_mask(metrics, min_speed=1)
+    assert mask.tolist() == [True, False, True, True]
+    assert filter_path.filter_mask(metrics).all()
+    assert filter_path.filter_path_table(
+        metrics, min_distance=10).tolist() == [0, 2, 3]
+    with pytest.raises(ValueError) as excinfo:
+        filter_path.filter_mask(metrics, min_distance=-1)
+    assert excinfo.value.args[0] == "Input values need to be positive"
+
+
+def test_filter_paths_by():
+    movement = data.load_movement(0, 0, 0)
+    paths = path_index(movement, 1, 1)
+    # same result as filter_paths for a time threshold alone
+    np.testing.assert_array_equal(
+        filter_path.filter_paths_by(movement, paths, min_duration=20),
+        filter_path.filter_paths(movement, paths, 20))
+    passing = filter_path.filter_paths_by(movement, paths, min_duration=5,
+                                          min_distance=20, min_points=10)
+    for start, end in passing:
+        dist, speed = get_dist_speed(movement, start, end, False)
+        t = movement['t']
+        assert t[end] - t[start] >= 5 and dist >= 20 and end - start >= 9
+    assert 0 < len(passing) < len(paths)
@@ -1,10 +1,12 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import numpy as np
 import pytest
 
 from mousestyles import data
-from mousestyles.path_diversity import path_index
+from mousestyles.data.utils import run_offsets
+from mousestyles.path_diversity import path_index, path_index_all
 
 
 def test_path_input():
@@ -28,4 +30,21 @@ def test_path():
     movement = data.load_movement(0, 0, 0)
     # Checking functions output the correct path
     paths = path_index(movement, 1, 1)
-    assert paths[:5] == [[22, 53], [55, 59], [67, 89], [91, 95], [96, 114]]
+    assert paths.shape[1] == 2
+    assert paths[:5].tolist() == [[22, 53], [55, 59], [67, 89], [91, 95],
+                                  [96, 114]]
+
+
+def test_path_all():
+    movement = data.load_all_movement()
+    paths = path_index_all(movement, 1, 1)
+    groups, offsets = run_offsets(movement[['strain', 'mouse', 'day']])
+    for i in [0, 50, len(groups) - 1]:
+        start, end = offsets[i], offsets[i + 1]
+        strain, mouse, day = [int(k) for k in groups[i]]
+        expected = path_index(data.load_movement(strain, mouse, day), 1, 1)
+        in_day = (paths[:, 0] >= start) & (paths[:, 0] < end)
+        np.testing.assert_array_equal(paths[in_day] - start, expected)
+    # no path crosses two mousedays
+    day = np.searchsorted(offsets, paths, side='right')
+    assert np.all(day[:, 0] == day[:, 1])
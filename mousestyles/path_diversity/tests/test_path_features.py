@@ -96,3 +96,44 @@ def test_compute_angles():
                         0, 0, 1], 'isHB': [True, True, False]})
     assert path_features.compute_angles(path) == [None, 90.0, None]
     assert path_features.compute_angles(path, True) == [None, np.pi / 2, None]
+
+
+def test_compute_headings():
+    headings = path_features.compute_headings([0, 1, 1, 1, 0],
+                                              [0, 0, 1, 1, 1])
+    np.testing.assert_allclose(headings, [0, np.pi / 2, np.nan, np.pi])
+    np.testing.assert_allclose(
+        path_features.compute_headings([0, 0], [0, -1], radian=False),
+        [-90.])
+
+
+def test_compute_turning_angles():
+    x = [0, 1, 1, 1, 0, -1]
+    y = [0, 0, 1, 1, 1, 2]
+    angles = path_features.compute_turning_angles(x, y)
+    # steps of zero length give nan angles on both sides
+    np.testing.assert_allclose(
+        angles, [np.nan, np.pi / 2, np.nan, np.nan, np.pi / 4, np.nan])
+    signed = path_features.compute_turning_angles(x, y, signed=True)
+    assert signed[4] == -np.pi / 4
+    assert path_features.compute_turning_angles(
+        [0, 1, 0], [0, 0, 0], radian=False)[1] == 180.
+    # slicing a path out of a whole mouseday gives compute_angles
+    path = pd.DataFrame({'t': [2, 4.5, 10.5, 11, 12],
+                         'x': [0, 1, 1, 3, 2], 'y': [0, 0, 1, 2, 4]})
+    angles = path_features.compute_turning_angles(path['x'], path['y'],
+                                                  radian=False)
+    np.testing.assert_allclose(
+        angles[2:4], path_features.compute_angles(path.iloc[1:5])[1:-1])
+
+
+def test_compute_step_speeds_accelerations():
+    speeds = path_features.compute_step_speeds([0, 3, 3, 3], [0, 4, 4, 5],
+                                               [0, 1, 3, 3])
+    np.testing.assert_allclose(speeds, [5, 0, np.nan])
+    accel = path_features.compute_step_accelerations([1, 2, 0],
+                                                     [3, 4, 5, 6])
+    np.testing.assert_allclose(accel, [0.5, -1.0])
+    accel = path_features.compute_step_accelerations([1, 2, 0],
+                                                     [3, 4, 3, 6])
+    np.testing.assert_allclose(accel, [np.nan, -1.0])
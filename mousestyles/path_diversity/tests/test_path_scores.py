@@ -0,0 +1,90 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mousestyles.path_diversity.path_scores import (aggregate_path_scores,
+                                                    efficiency_scores,
+                                                    exploration_scores,
+                                                    path_scores)
+from mousestyles.path_diversity.spatial_index import grid_cells
+
+
+def _movement():
+    return pd.DataFrame({'strain': [0, 0, 0, 0, 1, 1, 1],
+                         'mouse': [0, 0, 0, 0, 2, 2, 2],
+                         'day': [0, 0, 0, 0, 1, 1, 1],
+                         't': [0, 1, 2, 3, 0, 1, 2],
+                         'x': [-16, -12, -12, -16, 0, 0, 0],
+                         'y': [2, 2, 5, 5, 30, 30, 30]})
+
+
+def test_grid_cells():
+    cells = grid_cells([-16, 3, -7, -100], [2, 42, 20, 100], 2, 4)
+    assert cells.tolist() == [0, 7, 2, 6]
+
+
+def test_efficiency_scores():
+    movement = _movement()
+    paths = np.array([[0, 1], [0, 3], [4, 6]])
+    efficiency = efficiency_scores(movement, paths)
+    np.testing.assert_allclose(efficiency[:2], [1, 3. / 11])
+    assert np.isnan(efficiency[2])
+
+
+def test_exploration_scores():
+    movement = _movement()
+    paths = np.array([[0, 3], [4, 6]])
+    exploration = exploration_scores(movement, paths, 20, 42)
+    assert exploration.tolist() == [4, 1]
+    assert exploration_scores(movement, paths, 1, 1).tolist() == [1, 1]
+    with pytest.raises(TypeError) as excinfo:
+        exploration_scores(movement, paths, 2.0, 4)
+    expected = "xbins and ybins need to be integer"
+    assert excinfo.value.args[0] == expected
+    with pytest.raises(ValueError) as excinfo:
+        exploration_scores(movement, paths, 0, 4)
+    expected = "xbins and ybins need to be positive"
+    assert excinfo.value.args[0] == expected
+
+
+def test_path_scores():
+    movement = _movement()
+    scores = path_scores(movement, np.array([[0, 1], [2, 3], [4, 6]]))
+    assert list(scores.columns) == ['strain', 'mouse', 'day', 'start',
+                                    'stop', 'efficiency', 'exploration']
+    assert scores['strain'].tolist() == [0, 0, 1]
+    assert scores['exploration'].tolist() == [2, 2, 1]
+
+    aggregate = aggregate_path_scores(scores)
+    assert aggregate['count'].tolist() == [2, 1]
+    assert aggregate['efficiency_count'].tolist() == [2, 0]
+    np.testing.assert_allclose(aggregate['efficiency_mean'], [1, np.nan])
+    np.testing.assert_allclose(aggregate['exploration_mean'], [2, 1])
+    aggregate = aggregate_path_scores(scores, by='strain')
+    assert list(aggregate.columns[:3]) == ['strain', 'efficiency_mean',
+                                           'efficiency_std']
+    with pytest.raises(ValueError) as excinfo:
+        aggregate_path_scores(scores, by='mouse')
+    expected = "by should be 'mouseday' or 'strain'"
+    assert excinfo.value.args[0] == expected
+
+
+def test_aggregate_path_scores_zero_length():
+    # the second path has zero length and no efficiency
+    scores = pd.DataFrame({'strain': [0, 0, 0], 'mouse': [1, 1, 1],
+                           'day': [2, 2, 2], 'efficiency': [.5, np.nan, 1.],
+                           'exploration': [2, 5, 3]})
+    aggregate = aggregate_path_scores(scores)
+    assert aggregate['count'].tolist() == [3]
+    assert aggregate['efficiency_count'].tolist() == [2]
+    np.testing.assert_allclose(aggregate['efficiency_mean'], [.75])
+    np.testing.assert_allclose(aggregate['efficiency_std'], [.25])
+    np.testing.assert_allclose(aggregate['efficiency_stderr'], [.25])
+    # the exploration of the zero-length path still counts
+    np.testing.assert_allclose(
+        aggregate['exploration_mean'] * aggregate['count'], [10])
+    np.testing.assert_allclose(aggregate['exploration_std'],
+                               [np.std([2, 5, 3])])
@@ -0,0 +1,73 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.spatial.distance import squareform
+
+from mousestyles.path_diversity import path_similarity
+from mousestyles.path_diversity.resample_path import resample_paths
+
+
+def _naive_dtw(path_1, path_2, window):
+    k = len(path_1)
+    total = np.full((k + 1, k + 1), np.inf)
+    total[0, 0] = 0
+    for i in range(1, k + 1):
+        for j in range(1, k + 1):
+            if abs(i - j) <= window:
+                cost = np.hypot(*(path_1[i - 1] - path_2[j - 1]))
+                total[i, j] = cost + min(total[i - 1, j], total[i, j - 1],
+                                         total[i - 1, j - 1])
+    return total[k, k]
+
+
+def _movement():
+    rng = np.random.RandomState(0)
+    n = 400
+    return pd.DataFrame({'t': np.arange(n) * .1,
+                         'x': np.cumsum(rng.randn(n)),
+                         'y': np.cumsum(rng.randn(n))})
+
+
+def test_dtw_distance():
+    rng = np.random.RandomState(0)
+    path_1 = rng.randn(6, 8, 2)
+    path_2 = rng.randn(6, 8, 2)
+    for window in [0, 2, 8]:
+        expected = [_naive_dtw(p1, p2, window)
+                    for p1, p2 in zip(path_1, path_2)]
+        np.testing.assert_allclose(
+            path_similarity.dtw_distance(path_1, path_2, window), expected)
+    assert path_similarity.dtw_distance([[0, 0], [1, 0], [2, 0]],
+                                        [[0, 1], [1, 1], [2, 1]]) == 3.0
+    with pytest.raises(ValueError) as excinfo:
+        path_similarity.dtw_distance(path_1, path_2[:, :4])
+    error_message = "paths must have the same number of 2-d points"
+    assert excinfo.value.args[0] == error_message
+
+
+def test_path_distance_matrix():
+    movement = _movement()
+    paths = np.array([[k, k + 15] for k in range(0, 380, 20)])
+    resampled, _ = resample_paths(movement, paths, 10)
+    full = path_similarity.path_distance_matrix(movement, paths,
+                                                n_points=10, window=2,
+                                                chunk_size=7)
+    assert full.dtype == np.float32
+    square = squareform(full)
+    for i, j in [(0, 1), (3, 10), (17, 18)]:
+        assert np.isclose(square[i, j], _naive_dtw(
+            resampled[i].astype(float), resampled[j].astype(float), 2),
+            rtol=1e-5)
+
+    max_distance = np.percentile(full, 20)
+    pruned = path_similarity.path_distance_matrix(
+        movement, paths, n_points=10, window=2, max_distance=max_distance,
+        n_jobs=2, chunk_size=7)
+    close = full <= max_distance
+    np.testing.assert_allclose(pruned[close], full[close], rtol=1e-5)
+    # pruned pairs hold a lower bound larger than max_distance
+    assert np.all(pruned[~close] > max_distance)
+    assert np.all(pruned <= full * (1 + 1e-5))
@@ -0,0 +1,59 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mousestyles.path_diversity import path_table
+
+
+def _movement():
+    return pd.DataFrame({'strain': [0] * 7 + [1] * 4,
+                         'mouse': [0] * 7 + [2] * 4,
+                         'day': [0] * 7 + [1] * 4,
+                         't': [0, .5, 1, 1.5, 5, 5.5, 6, 7, 7.5, 8, 9],
+                         'x': [0, 1, 1, 1, 0, 0, 0, 0, 3, 3, 3],
+                         'y': [0, 0, 1, 2, 0, 1, 1, 0, 4, 4, 4],
+                         'isHB': [True, False, False, False, True, True,
+                                  True, False, False, True, True]},
+                        columns=['strain', 'mouse', 'day', 't', 'x', 'y',
+                                 'isHB'])
+
+
+def test_path_table():
+    table = path_table.get_path_table(_movement(), 1, 1)
+    assert list(table.columns) == path_table.PATH_TABLE_COLUMNS
+    assert table[['strain', 'mouse', 'day', 'start', 'stop']].values.tolist()\
+        == [[0, 0, 0, 0, 3], [0, 0, 0, 4, 6], [1, 2, 1, 0, 2]]
+    np.testing.assert_allclose(table['n_points'], [4, 3, 3])
+    np.testing.assert_allclose(table['distance'], [3, 1, 5])
+    np.testing.assert_allclose(table['duration'], [1.5, 1, 1])
+    np.testing.assert_allclose(table['mean_speed'], [2, 1, 5])
+    np.testing.assert_allclose(table['max_speed'], [2, 2, 10])
+    np.testing.assert_allclose(table['mean_abs_angle'],
+                               [np.pi / 4, np.nan, np.nan])
+    np.testing.assert_allclose(table['straightness'],
+                               [np.sqrt(5) / 3, 1, 1])
+    assert table['start_hb'].tolist() == [True, True, False]
+    assert table['stop_hb'].tolist() == [False, True, True]
+
+    pooled = path_table.get_path_table(_movement(), 1, 1, n_jobs=2)
+    assert table.equals(pooled)
+
+
+def test_path_table_input():
+    with pytest.raises(ValueError) as excinfo:
+        path_table.get_path_table(_movement(), 0, 1)
+    assert excinfo.value.args[0] == "Input values need to be positive"
+    with pytest.raises(ValueError) as excinfo:
+        path_table.get_path_table(_movement(), 1, 1, n_jobs=0)
+    assert excinfo.value.args[0] == "n_jobs should be positive int"
+
+
+def test_save_load_path_table(tmpdir):
+    table = path_table.get_path_table(_movement(), 1, 1)
+    file_name = str(tmpdir.join('paths.npz'))
+    path_table.save_path_table(table, file_name)
+    loaded = path_table.load_path_table(file_name)
+    assert table.equals(loaded)
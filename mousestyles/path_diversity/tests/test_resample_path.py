@@ -0,0 +1,53 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mousestyles.path_diversity.resample_path import resample_paths
+
+
+def test_resample_paths():
+    movement = pd.DataFrame({'t': [0, 1, 2, 5, 6], 'x': [0, 3, 3, 3, 5],
+                             'y': [0, 0, 0, 3, 3]})
+    paths = np.array([[0, 3], [3, 4], [1, 2]])
+    resampled, metadata = resample_paths(movement, paths, 4)
+    assert resampled.dtype == np.float32
+    assert resampled.shape == (3, 4, 2)
+    np.testing.assert_allclose(resampled[0], [[0, 0], [2, 0], [3, 1],
+                                              [3, 3]])
+    np.testing.assert_allclose(resampled[1, :, 0], [3, 11. / 3, 13. / 3, 5])
+    # a path of zero length stays at its first point
+    np.testing.assert_allclose(resampled[2], [[3, 0]] * 4)
+    assert list(metadata.columns) == ['start', 'stop', 'start_time',
+                                      'stop_time', 'length', 'duration']
+    np.testing.assert_allclose(metadata['length'], [6, 2, 0])
+    np.testing.assert_allclose(metadata['duration'], [5, 1, 1])
+
+    resampled, _ = resample_paths(movement, paths[:1], 6, by='time')
+    np.testing.assert_allclose(resampled[0], [[0, 0], [3, 0], [3, 0],
+                                              [3, 1], [3, 2], [3, 3]],
+                               atol=1e-6)
+
+
+def test_resample_paths_mousedays():
+    # times restart with the second mouseday
+    movement = pd.DataFrame({'strain': [0, 0, 0, 1, 1, 1],
+                             'mouse': [0, 0, 0, 2, 2, 2],
+                             'day': [0, 0, 0, 1, 1, 1],
+                             't': [5, 6, 7, 1, 2, 4],
+                             'x': [0, 1, 2, 0, 0, 0],
+                             'y': [0, 0, 0, 0, 2, 6]})
+    resampled, metadata = resample_paths(movement, [[0, 2], [3, 5]], 3,
+                                         by='time')
+    np.testing.assert_allclose(resampled[0], [[0, 0], [1, 0], [2, 0]])
+    np.testing.assert_allclose(resampled[1], [[0, 0], [0, 3], [0, 6]])
+    assert metadata[['strain', 'mouse', 'day']].values.tolist() == \
+        [[0, 0, 0], [1, 2, 1]]
+    with pytest.raises(ValueError) as excinfo:
+        resample_paths(movement, [[0, 2]], 3, by='speed')
+    assert excinfo.value.args[0] == "by should be 'arc_length' or 'time'"
+    with pytest.raises(ValueError) as excinfo:
+        resample_paths(movement, [[4, 6]], 3)
+    assert excinfo.value.args[0] == "paths must be indices of movement"
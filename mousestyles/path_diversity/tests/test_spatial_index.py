@@ -0,0 +1,63 @@
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mousestyles.path_diversity.spatial_index import (SpatialIndex,
+                                                      path_membership)
+
+
+def _movement(n=500):
+    rng = np.random.RandomState(0)
+    return pd.DataFrame({'t': np.sort(rng.uniform(0, 100, n)),
+                         'x': rng.uniform(-17, 4, n),
+                         'y': rng.uniform(0, 44, n)})
+
+
+def test_query_samples():
+    movement = _movement()
+    index = SpatialIndex(movement, xbins=5, ybins=7)
+    x, y, t = movement['x'], movement['y'], movement['t']
+    for xlims, ylims, tlims in [((-10, -2), (5, 20), None),
+                                ((-10, -2), (5, 20), (20, 60)),
+                                ((-20, 5), (-1, 50), None),
+                                ((1, 1.5), (42, 50), (0, 100))]:
+        expected = (x >= xlims[0]) & (x <= xlims[1]) & \
+            (y >= ylims[0]) & (y <= ylims[1])
+        if tlims is not None:
+            expected &= (t >= tlims[0]) & (t <= tlims[1])
+        np.testing.assert_array_equal(
+            index.query_samples(xlims, ylims, tlims),
+            np.flatnonzero(expected))
+    with pytest.raises(ValueError) as excinfo:
+        index.query_samples((0, -1), (5, 20))
+    assert excinfo.value.args[0] == "lower limits must not exceed upper limits"
+
+
+def test_query_paths(tmpdir):
+    movement = _movement()
+    paths = np.array([[0, 9], [20, 49], [100, 499]])
+    index = SpatialIndex(movement, paths, xbins=5, ybins=7)
+    rows = index.query_samples((-10, -2), (5, 20), (0, 30))
+    expected = [i for i, (start, end) in enumerate(paths)
+                if np.any((rows >= start) & (rows <= end))]
+    np.testing.assert_array_equal(
+        index.query_paths((-10, -2), (5, 20), (0, 30)), expected)
+
+    file_name = str(tmpdir.join('index.npz'))
+    index.save(file_name)
+    loaded = SpatialIndex.load(file_name)
+    np.testing.assert_array_equal(
+        loaded.query_paths((-10, -2), (5, 20), (0, 30)), expected)
+    with pytest.raises(ValueError) as excinfo:
+        SpatialIndex(movement).query_paths((-10, -2), (5, 20))
+    assert excinfo.value.args[0] == "the index was built without paths"
+
+
+def test_path_membership():
+    path_ids = path_membership(8, np.array([[0, 1], [3, 3], [5, 7]]))
+    assert path_ids.tolist() == [0, 0, -1, 1, -1, 2, 2, 2]
+    assert path_membership(3, np.zeros((0, 2), dtype=int)).tolist() == \
+        [-1, -1, -1]